@@ -0,0 +1,249 @@
+"""Локальные заглушки API Практикума и Telegram Bot API для нагрузки.
+
+Обе заглушки работают в одном процессе и делят журнал изменений, поэтому
+заглушка Telegram может посчитать задержку от смены статуса до
+получения уведомления.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STATUS_FLOW = {
+    None: 'reviewing',
+    'reviewing': ('approved', 'rejected'),
+    'rejected': 'reviewing',
+    'approved': 'reviewing',
+}
+VERDICT_MARK = 'Изменился статус проверки работы "'
+
+
+class Behaviour:
+    """Параметры заглушки: задержка, доля ошибок и частота изменений."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, churn=0.1,
+                 homeworks=3, throttle_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.churn = churn
+        self.homeworks = homeworks
+        self.throttle_rate = throttle_rate
+
+
+class World:
+    """Общее состояние заглушек: работы студентов и журнал доставки."""
+
+    def __init__(self, behaviour, seed=0):
+        self.behaviour = behaviour
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.homeworks = {}
+        self.changed_at = {}
+        self.polls = 0
+        self.sends = 0
+        self.latencies = []
+
+    def homeworks_for(self, token):
+        """Работы студента; иногда меняет статус одной из них."""
+        with self.lock:
+            self.polls += 1
+            works = self.homeworks.setdefault(token, [
+                {'id': f'{token}-{number}', 'status': None, 'updated': 0}
+                for number in range(self.behaviour.homeworks)
+            ])
+            if self.random.random() < self.behaviour.churn:
+                self._change(self.random.choice(works))
+            return [dict(work) for work in works if work['status']]
+
+    def _change(self, work):
+        following = STATUS_FLOW[work['status']]
+        if isinstance(following, tuple):
+            following = self.random.choice(following)
+        work['status'] = following
+        work['updated'] = time.time()
+        self.changed_at[work['id']] = work['updated']
+
+    def delivered(self, text):
+        """Учитывает доставленное уведомление и его задержку."""
+        received = time.time()
+        with self.lock:
+            self.sends += 1
+            if text.startswith(VERDICT_MARK):
+                name = text[len(VERDICT_MARK):].split('"', 1)[0]
+                changed = self.changed_at.get(name)
+                if changed is not None:
+                    self.latencies.append(received - changed)
+
+    def stats(self):
+        """Счетчики с момента последнего сброса."""
+        with self.lock:
+            return {
+                'polls': self.polls,
+                'sends': self.sends,
+                'latencies': list(self.latencies),
+            }
+
+    def reset(self):
+        """Обнуляет счетчики, сохраняя работы студентов."""
+        with self.lock:
+            self.polls = self.sends = 0
+            self.latencies = []
+
+
+def iso(timestamp):
+    """Дата в формате поля `date_updated`."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: задержка, сбои, ответ JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    world = None
+
+    def reply(self, status, payload, headers=()):
+        """Отправляет JSON-ответ."""
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def misbehave(self):
+        """Выдерживает задержку и иногда отвечает ошибкой 500."""
+        behaviour = self.world.behaviour
+        if behaviour.latency:
+            time.sleep(behaviour.latency)
+        if self.world.random.random() < behaviour.error_rate:
+            self.reply(500, {'detail': 'injected failure'})
+            return True
+        return False
+
+    def log_message(self, format, *args):
+        """Заглушки не пишут журнал запросов."""
+
+
+class PracticumHandler(FakeHandler):
+    """GET /api/user_api/homework_statuses/?from_date=..."""
+
+    def do_GET(self):
+        """Отдает работы, измененные после `from_date`."""
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            self.reply(200, self.world.stats())
+            return
+        if url.path == '/reset':
+            self.world.reset()
+            self.reply(200, {})
+            return
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        if not token:
+            self.reply(401, {'code': 'not_authenticated'})
+            return
+        if self.misbehave():
+            return
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        works = [
+            {
+                'id': work['id'],
+                'homework_name': work['id'],
+                'status': work['status'],
+                'date_updated': iso(work['updated']),
+                'lesson_name': 'Нагрузочный тест',
+                'reviewer_comment': '',
+            }
+            for work in self.world.homeworks_for(token)
+            if work['updated'] >= from_date
+        ]
+        works.sort(key=lambda work: work['date_updated'], reverse=True)
+        etag = '"{:x}"'.format(hash(json.dumps(works)) & 0xffffffff)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.reply(200, {
+            'homeworks': works, 'current_date': int(time.time())
+        }, headers=[('ETag', etag)])
+
+
+class TelegramHandler(FakeHandler):
+    """POST /bot<token>/sendMessage в форме, которую шлют оба режима."""
+
+    def do_POST(self):
+        """Принимает сообщение и учитывает его доставку."""
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not url.path.endswith('/sendMessage'):
+            self.reply(404, {'ok': False})
+            return
+        if self.world.random.random() < self.world.behaviour.throttle_rate:
+            self.reply(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+            return
+        if self.misbehave():
+            return
+        payload = {
+            key: values[0] for key, values in parse_qs(url.query).items()
+        }
+        if raw:
+            if 'json' in self.headers.get('Content-Type', ''):
+                payload.update(json.loads(raw))
+            else:
+                payload.update({
+                    key: values[0]
+                    for key, values in parse_qs(raw.decode()).items()
+                })
+        self.world.delivered(payload.get('text', ''))
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': 1, 'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', ''),
+        }})
+
+
+class QuietServer(ThreadingHTTPServer):
+    """Сервер заглушки: не печатает разрывы соединений клиентом."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Разрыв соединения при остановке бота не считается ошибкой."""
+
+
+def start(behaviour, host='127.0.0.1'):
+    """Запускает обе заглушки; возвращает мир и два сервера."""
+    world = World(behaviour)
+    servers = []
+    for handler in (PracticumHandler, TelegramHandler):
+        bound = type(handler.__name__, (handler,), {'world': world})
+        server = QuietServer((host, 0), bound)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return world, servers[0], servers[1]
+
+
+def base_url(server):
+    """Адрес запущенного сервера."""
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}'
+
+
+def serve(behaviour, ready):
+    """Точка входа процесса заглушек: сообщает адреса и ждет завершения."""
+    world, practicum, telegram = start(behaviour)
+    ready.send((base_url(practicum), base_url(telegram)))
+    threading.Event().wait()
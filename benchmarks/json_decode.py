@@ -0,0 +1,77 @@
+"""Сравнение бэкендов JSON на ответах homework_statuses разного размера.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.json_decode --sizes 0 1 10 100 1000
+"""
+import argparse
+import json
+import timeit
+
+import decoding
+from changes import STATUSES
+
+COMMENT = 'Хорошая работа, но обратите внимание на обработку исключений. '
+
+
+def make_payload(count):
+    """Тело ответа API с `count` работами, похожими на настоящие."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': 120000 + number,
+                'status': STATUSES[number % len(STATUSES)],
+                'homework_name': f'student__hw{number:02d}_project.zip',
+                'reviewer_comment': COMMENT * (number % 4),
+                'date_updated': '2023-05-{:02d}T10:31:09Z'.format(
+                    number % 28 + 1
+                ),
+                'lesson_name': f'Спринт {number % 20 + 1}: итоговый проект',
+            }
+            for number in range(count)
+        ],
+        'current_date': 1684000000,
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def measure(loads, body, budget):
+    """Среднее время одного декодирования в микросекундах."""
+    timer = timeit.Timer(lambda: loads(body))
+    number, _ = timer.autorange()
+    number = max(1, int(number * budget / 0.2))
+    return min(timer.repeat(repeat=3, number=number)) / number * 10 ** 6
+
+
+def main(argv=None):
+    """Печатает время декодирования каждым бэкендом и ускорение."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[0, 1, 10, 100, 1000]
+    )
+    parser.add_argument(
+        '--budget', type=float, default=0.2,
+        help='примерное время замера одного варианта, с'
+    )
+    args = parser.parse_args(argv)
+    backends = {'json': decoding.select_loads('json')}
+    if decoding.find_orjson() is not None:
+        backends['orjson'] = decoding.select_loads('orjson')
+    else:
+        print('orjson не установлен, сравнивать не с чем')
+    print(f'{"работ":>6} {"байт":>9} ' + ' '.join(
+        f'{name + ", мкс":>14}' for name in backends
+    ) + f' {"ускорение":>10}')
+    for count in args.sizes:
+        body = make_payload(count)
+        timings = {
+            name: measure(loads, body, args.budget)
+            for name, loads in backends.items()
+        }
+        speedup = timings['json'] / min(timings.values())
+        print(f'{count:>6} {len(body):>9} ' + ' '.join(
+            f'{value:>14.1f}' for value in timings.values()
+        ) + f' {speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
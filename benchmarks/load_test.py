@@ -0,0 +1,279 @@
+"""Нагрузочный тест бота на локальных заглушках Практикума и Telegram.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.load_test --mode async --tenants 10 100 1000
+
+Получатели опрашиваются подряд, без пауз планировщика, поэтому цифры
+показывают пропускную способность конвейера, а не `RETRY_PERIOD`.
+Для каждого числа получателей поднимаются свежие заглушки в отдельном
+процессе, чтобы их работа не влияла на RSS и GIL бота.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from urllib.request import urlopen
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('LOG_FILE', os.devnull)
+
+import bot_async  # noqa: E402
+import homework  # noqa: E402
+from benchmarks.fakes import Behaviour, serve  # noqa: E402
+from lifecycle import Lifecycle  # noqa: E402
+from outbound import RateLimiter, SendQueue  # noqa: E402
+from outbox import Outbox  # noqa: E402
+from state import StateStore  # noqa: E402
+from tenants import Tenant, TenantRegistry  # noqa: E402
+
+BENCH_TOKEN = '1:benchmark'
+HOMEWORK_PATH = '/api/user_api/homework_statuses/'
+REPORT_FIELDS = (
+    'tenants', 'polls_per_s', 'sends_per_s', 'p50_ms', 'p99_ms', 'rss_mb'
+)
+
+
+def rss_mb():
+    """Текущий RSS процесса в мегабайтах."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированной выборке; None для пустой."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def start_fakes(behaviour):
+    """Запускает заглушки в отдельном процессе; возвращает процесс и URL."""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=serve, args=(behaviour, sender), daemon=True
+    )
+    process.start()
+    practicum_url, telegram_url = receiver.recv()
+    return process, practicum_url, telegram_url
+
+
+def point_bot_at(practicum_url, telegram_url):
+    """Направляет оба режима бота на заглушки."""
+    from telebot import apihelper
+
+    homework.ENDPOINT = practicum_url + HOMEWORK_PATH
+    homework.TELEGRAM_TOKEN = BENCH_TOKEN
+    apihelper.API_URL = telegram_url + '/bot{0}/{1}'
+    bot_async.TELEGRAM_API_URL = telegram_url + '/bot{token}/{method}'
+
+
+def make_registry(count):
+    """Реестр из `count` получателей с разными токенами и чатами."""
+    registry = TenantRegistry()
+    for number in range(count):
+        registry.add(Tenant(f'token-{number}', str(100000 + number)))
+    return registry
+
+
+def make_limiter(unlimited):
+    """Лимитер Telegram; без ограничений, если заглушке они не нужны."""
+    if unlimited:
+        return RateLimiter(global_rate=10 ** 6, chat_rate=10 ** 6)
+    return RateLimiter()
+
+
+def run_sync(registry, duration, unlimited, threads=0):
+    """Крутит синхронный цикл `homework.Poller`; возвращает число опросов.
+
+    С `threads` получатели опрашиваются пулом потоков, как при
+    `POLL_THREADS`.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from telebot import TeleBot
+
+    store = StateStore(':memory:')
+    outbox = Outbox(':memory:')
+    sender = SendQueue(
+        TeleBot(token=BENCH_TOKEN), homework.send_message,
+        limiter=make_limiter(unlimited), on_result=outbox.settle
+    )
+    pool = None
+    if threads:
+        homework.HTTP_SESSION = homework.create_session(threads)
+        pool = ThreadPoolExecutor(threads)
+    poller = homework.Poller(sender, store, outbox, pool=pool)
+    lifecycle = Lifecycle()
+    tenants = list(registry)
+    polls = 0
+    deadline = time.monotonic() + duration
+    try:
+        while time.monotonic() < deadline:
+            for _ in poller.poll_all(tenants, lifecycle):
+                polls += 1
+            sender.join()
+            store.maybe_flush()
+    finally:
+        poller.close()
+        homework.HTTP_SESSION = None
+    return polls
+
+
+async def run_async(registry, duration, unlimited):
+    """Крутит цикл `bot_async.AsyncPoller`; возвращает число опросов."""
+    store = StateStore(':memory:')
+    outbox = Outbox(':memory:')
+    polls = 0
+    async with bot_async.client_session(bot_async.FETCH_CONCURRENCY) as http, \
+            bot_async.client_session(bot_async.SEND_CONCURRENCY) as telegram:
+        poller = bot_async.AsyncPoller(
+            http, telegram, store, outbox, limiter=make_limiter(unlimited)
+        )
+        deadline = time.monotonic() + duration
+        tenants = list(registry)
+        try:
+            while time.monotonic() < deadline:
+                await poller.poll(tenants)
+                polls += len(tenants)
+                store.maybe_flush()
+        finally:
+            outbox.close()
+            store.close()
+    return polls
+
+
+def fetch_stats(practicum_url):
+    """Счетчики заглушек: доставленные сообщения и их задержки."""
+    with urlopen(practicum_url + '/stats') as response:
+        return json.load(response)
+
+
+def measure(args, count):
+    """Один прогон для `count` получателей; возвращает строку отчета."""
+    behaviour = Behaviour(
+        latency=args.latency, error_rate=args.error_rate, churn=args.churn,
+        homeworks=args.homeworks, throttle_rate=args.throttle_rate
+    )
+    process, practicum_url, telegram_url = start_fakes(behaviour)
+    try:
+        point_bot_at(practicum_url, telegram_url)
+        registry = make_registry(count)
+        started = time.monotonic()
+        if args.mode == 'async':
+            polls = asyncio.run(
+                run_async(registry, args.duration, args.unlimited)
+            )
+        else:
+            polls = run_sync(
+                registry, args.duration, args.unlimited, args.poll_threads
+            )
+        elapsed = time.monotonic() - started
+        stats = fetch_stats(practicum_url)
+    finally:
+        process.terminate()
+        process.join()
+    p50 = percentile(stats['latencies'], 0.5)
+    p99 = percentile(stats['latencies'], 0.99)
+    return {
+        'tenants': count,
+        'polls_per_s': round(polls / elapsed, 1),
+        'sends_per_s': round(stats['sends'] / elapsed, 1),
+        'p50_ms': None if p50 is None else round(p50 * 1000, 1),
+        'p99_ms': None if p99 is None else round(p99 * 1000, 1),
+        'rss_mb': round(rss_mb(), 1),
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """Строки отчета, где пропускная способность упала ниже допуска."""
+    expected = {row['tenants']: row for row in baseline['results']}
+    failed = []
+    for row in report['results']:
+        previous = expected.get(row['tenants'])
+        if previous is None:
+            continue
+        for field in ('polls_per_s', 'sends_per_s'):
+            if row[field] < previous[field] * (1 - tolerance):
+                failed.append(
+                    f'{row["tenants"]} получателей: {field} '
+                    f'{row[field]} < {previous[field]}'
+                )
+    return failed
+
+
+def parse_args(argv):
+    """Параметры прогона из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--mode', choices=('sync', 'async'), default='async')
+    parser.add_argument(
+        '--tenants', type=int, nargs='+', default=[10, 100, 1000]
+    )
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help='задержка ответа заглушек, с'
+    )
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0,
+        help='доля ответов 500'
+    )
+    parser.add_argument(
+        '--throttle-rate', type=float, default=0.0,
+        help='доля ответов Telegram 429'
+    )
+    parser.add_argument(
+        '--churn', type=float, default=0.1,
+        help='вероятность смены статуса при опросе'
+    )
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument(
+        '--poll-threads', type=int, default=0,
+        help='размер пула опроса в режиме sync'
+    )
+    parser.add_argument(
+        '--unlimited', action='store_true',
+        help='снять лимиты Telegram 30/с и 1/с на чат'
+    )
+    parser.add_argument('--output', help='записать отчет в JSON')
+    parser.add_argument('--baseline', help='сравнить с прошлым отчетом')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Прогоняет нагрузку и печатает таблицу; 1 при регрессии."""
+    args = parse_args(argv)
+    homework.setup_logging()
+    report = {'mode': args.mode, 'results': []}
+    print(' '.join(f'{field:>12}' for field in REPORT_FIELDS))
+    for count in args.tenants:
+        row = measure(args, count)
+        report['results'].append(row)
+        print(' '.join(f'{str(row[field]):>12}' for field in REPORT_FIELDS))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            failed = regressions(report, json.load(baseline), args.tolerance)
+        for line in failed:
+            print(f'Регрессия: {line}', file=sys.stderr)
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
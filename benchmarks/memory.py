@@ -0,0 +1,109 @@
+"""Память состояния бота на большом числе работ.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.memory --tenants 10000 --homeworks 10
+
+Считается память, выделенная под получателей, индексы статусов и
+расписание (tracemalloc), а для сравнения — под словарь с готовым текстом
+сообщения на каждую работу.
+"""
+import argparse
+import sys
+import tracemalloc
+
+from changes import STATUSES
+from scheduler import AdaptiveScheduler
+from tenants import Tenant, TenantRegistry
+
+VERDICT = 'Работа проверена: ревьюеру всё понравилось. Ура!'
+
+
+def make_homework(number, homework_id):
+    """Работа из ответа API с правдоподобными полями."""
+    return {
+        'id': homework_id,
+        'homework_name': f'student_{number}__hw{homework_id}.zip',
+        'status': STATUSES[homework_id % len(STATUSES)],
+        'date_updated': (
+            f'2024-{homework_id % 12 + 1:02}-{number % 28 + 1:02}'
+            f'T10:{number % 60:02}:00Z'
+        ),
+    }
+
+
+def build_state(tenants, homeworks):
+    """Получатели с индексами статусов и расписанием опроса."""
+    registry = TenantRegistry()
+    scheduler = AdaptiveScheduler(600, 120, 3600)
+    for number in range(tenants):
+        tenant = Tenant(f'y0_token_{number:06}', 100000 + number)
+        for homework_id in range(number * homeworks, (number + 1) * homeworks):
+            tenant.index.update(make_homework(number, homework_id))
+        registry.add(tenant)
+        scheduler.schedule(tenant, changed=True)
+    return registry, scheduler
+
+
+def build_messages(tenants, homeworks):
+    """Прежний подход: текст сообщения на каждую работу."""
+    state = {}
+    for number in range(tenants):
+        state[str(100000 + number)] = {
+            str(homework_id): (
+                'Изменился статус проверки работы '
+                f'"{make_homework(number, homework_id)["homework_name"]}". '
+                f'{VERDICT}'
+            )
+            for homework_id in range(
+                number * homeworks, (number + 1) * homeworks
+            )
+        }
+    return state
+
+
+def measure(build, *args):
+    """Память в байтах, которую удерживает результат `build`."""
+    tracemalloc.start()
+    try:
+        state = build(*args)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del state
+    return current
+
+
+def parse_args(argv):
+    """Параметры прогона из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument(
+        '--homeworks', type=int, default=10, help='работ у получателя'
+    )
+    parser.add_argument(
+        '--limit-mb', type=float, default=50,
+        help='допустимая память состояния, МБ'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Печатает память обоих вариантов; 1, если превышен лимит."""
+    args = parse_args(argv)
+    total = args.tenants * args.homeworks
+    compact = measure(build_state, args.tenants, args.homeworks)
+    messages = measure(build_messages, args.tenants, args.homeworks)
+    for title, size in (('состояние', compact), ('тексты', messages)):
+        print(
+            f'{title:>10}: {size / 2 ** 20:8.1f} МБ, '
+            f'{size / total:6.0f} Б на работу ({total} работ)'
+        )
+    if compact > args.limit_mb * 2 ** 20:
+        print(f'Превышен лимит {args.limit_mb} МБ', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Накладные расходы планирования: колесо таймеров против кучи.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.timers --timers 10000 100000 1000000
+
+Для каждого размера таймеры ставятся со сроками в пределах часа, десятая
+часть переставляется, а затем время идет от срабатывания к срабатыванию,
+пока каждый таймер не сработает и не будет поставлен заново, как после
+опроса получателя.
+"""
+import argparse
+import heapq
+import random
+import time
+
+from timing_wheel import TimingWheel
+
+
+class HeapTimers:
+    """Куча с ленивым удалением, с тем же интерфейсом, что у колеса."""
+
+    def __init__(self):
+        self.now = 0
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def add(self, key, when):
+        """Ставит таймер, прежний остается в куче до извлечения."""
+        when = max(when, self.now)
+        self._deadlines[key] = when
+        heapq.heappush(self._heap, (when, key))
+
+    def cancel(self, key):
+        """Снимает таймер."""
+        self._deadlines.pop(key, None)
+
+    def advance(self, until):
+        """Сдвигает время и возвращает истекшие ключи."""
+        self.now = until
+        expired = []
+        while self._heap and self._heap[0][0] <= until:
+            when, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == when:
+                del self._deadlines[key]
+                expired.append(key)
+        return expired
+
+    def next_time(self):
+        """Ближайший срок среди живых таймеров."""
+        while self._heap:
+            when, key = self._heap[0]
+            if self._deadlines.get(key) == when:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+
+def run(timers, count, seed):
+    """Время фаз в микросекундах на таймер."""
+    rng = random.Random(seed)
+    deadlines = [rng.randrange(3600) for _ in range(count)]
+    intervals = [rng.choice((120, 600, 1200, 3600)) for _ in range(count)]
+    phases = {}
+    started = time.perf_counter()
+    for key, when in enumerate(deadlines):
+        timers.add(key, when)
+    phases['вставка'] = time.perf_counter() - started
+    moved = range(0, count, 10)
+    started = time.perf_counter()
+    for key in moved:
+        timers.cancel(key)
+        timers.add(key, deadlines[key] + 60)
+    phases['перестановка'] = (time.perf_counter() - started) * 10
+    fired = 0
+    started = time.perf_counter()
+    while fired < count:
+        for key in timers.advance(timers.next_time()):
+            fired += 1
+            timers.add(key, timers.now + intervals[key])
+    phases['срабатывание'] = time.perf_counter() - started
+    return {name: value / count * 10 ** 6 for name, value in phases.items()}
+
+
+def main(argv=None):
+    """Печатает время фаз для колеса и кучи."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--timers', type=int, nargs='+', default=[10000, 100000, 1000000]
+    )
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    print(f'{"таймеров":>9} {"вариант":>8} {"вставка":>9} '
+          f'{"перестановка":>13} {"срабатывание":>13}  (мкс на таймер)')
+    for count in args.timers:
+        variants = (('колесо', TimingWheel()), ('куча', HeapTimers()))
+        for name, timers in variants:
+            phases = run(timers, count, args.seed)
+            print(f'{count:>9} {name:>8} ' + ' '.join(
+                f'{value:>{width}.2f}'
+                for value, width in zip(phases.values(), (9, 13, 13))
+            ))
+
+
+if __name__ == '__main__':
+    main()
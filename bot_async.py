@@ -0,0 +1,351 @@
+"""Асинхронный режим бота: опрос API и отправка сообщений параллельно."""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from http import HTTPStatus
+
+import aiohttp
+
+import decoding
+import homework
+import metrics
+from exceptions import ApiCodeError, SendMessageError, TenantConfigError
+from lifecycle import STOP_SIGNALS, WAKE_SIGNAL
+from metrics import SCHEDULER_LAG, TENANT_POLLS, timed
+from outbound import RateLimiter, telegram_retry_after
+from outbox import Outbox
+from profiling import PROFILE_SIGNAL, SNAPSHOT_SIGNAL, SignalProfiler
+from resilience import ResilientCaller, parse_retry_after
+from state import StateStore
+
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', 100))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 20))
+SEND_ATTEMPTS = 3
+TELEGRAM_API_URL = 'https://api.telegram.org/bot{token}/{method}'
+
+
+async def get_api_answer_async(session, tenant):
+    """Асинхронный запрос к эндпоинту API-сервиса."""
+    cache = homework.RESPONSE_CACHE
+    try:
+        async with session.get(
+            homework.ENDPOINT,
+            headers=cache.request_headers(
+                tenant, tenant.timestamp, tenant.headers
+            ),
+            params={'from_date': tenant.timestamp}
+        ) as response:
+            if response.status == HTTPStatus.NOT_MODIFIED:
+                cached = cache.replay(tenant, tenant.timestamp)
+                if cached is not None:
+                    logging.info('Ответ API не изменился')
+                    return cached
+            if response.status != HTTPStatus.OK:
+                raise ApiCodeError(
+                    f'Ошибка доступа к API: код {response.status}',
+                    response.status,
+                    parse_retry_after(response.headers.get('Retry-After'))
+                )
+            logging.info('API доступно')
+            try:
+                api_response = cache.store(
+                    tenant, tenant.timestamp, response.headers,
+                    await response.read(), decoding.loads
+                )
+            except json.JSONDecodeError as error:
+                raise json.JSONDecodeError(
+                    'Ошибка получения данных', error.doc, error.pos
+                )
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        raise ApiCodeError('API недоступно')
+    logging.info('Данные успешно получены')
+    return api_response
+
+
+async def send_message_async(session, chat_id, message):
+    """Асинхронно отправляет сообщение в Telegram-чат получателя."""
+    logging.debug('Начало отправки сообщения в Telegram')
+    url = TELEGRAM_API_URL.format(
+        token=homework.TELEGRAM_TOKEN, method='sendMessage'
+    )
+    try:
+        async with session.post(
+            url, json={'chat_id': chat_id, 'text': message}
+        ) as response:
+            if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+                result = await response.json(content_type=None)
+                logging.error('Сбой при отправке сообщения')
+                raise SendMessageError(
+                    retry_after=telegram_retry_after(result)
+                )
+            response.raise_for_status()
+        logging.debug('Удачная отправка сообщения')
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        logging.error('Сбой при отправке сообщения')
+        raise SendMessageError() from error
+
+
+class AsyncPoller:
+    """Опрашивает получателей с отдельными ограничениями на этапы."""
+
+    def __init__(self, http, telegram, store, outbox,
+                 fetch_limit=FETCH_CONCURRENCY, send_limit=SEND_CONCURRENCY,
+                 caller=None, limiter=None):
+        self.http = http
+        self.telegram = telegram
+        self.store = store
+        self.outbox = outbox
+        self.caller = caller or ResilientCaller()
+        self.limiter = limiter or RateLimiter()
+        self.fetch_slots = asyncio.Semaphore(fetch_limit)
+        self.send_slots = asyncio.Semaphore(send_limit)
+
+    async def send(self, tenant, message):
+        """Отправляет сообщение с учетом лимитов Telegram и ответов 429."""
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            await asyncio.sleep(self.limiter.reserve(tenant.chat_id))
+            try:
+                async with self.send_slots:
+                    with timed('send'):
+                        await send_message_async(
+                            self.telegram, tenant.chat_id, message
+                        )
+                return True
+            except SendMessageError as error:
+                if error.retry_after is None or attempt == SEND_ATTEMPTS:
+                    return False
+                logging.warning(
+                    f'Telegram ограничил отправку, повтор через '
+                    f'{error.retry_after} с'
+                )
+                await asyncio.sleep(error.retry_after)
+        return False
+
+    async def deliver(self, tenant, items):
+        """Отправляет записи outbox по порядку и подтверждает их."""
+        for key, message in items:
+            self.outbox.settle(key, await self.send(tenant, message))
+
+    async def redrive(self, registry):
+        """Повторно отправляет неподтвержденные уведомления."""
+        backlog = {}
+        for key, tenant_id, message in self.outbox.pending():
+            backlog.setdefault(tenant_id, []).append((key, message))
+        await asyncio.gather(*(
+            self.deliver(registry.get(tenant_id), items)
+            for tenant_id, items in backlog.items()
+            if registry.get(tenant_id) is not None
+        ))
+        self.outbox.prune()
+
+    async def poll_tenant(self, tenant):
+        """Опрашивает API для одного получателя и сообщает об изменениях.
+
+        Возвращает True, если статус хотя бы одной работы изменился.
+        """
+        changed, = await self.poll_group([tenant])
+        return changed
+
+    async def poll_group(self, tenants):
+        """Один запрос к API на всех получателей с общим токеном.
+
+        Как `homework.Poller.poll_group`: ответ разбирается для каждого
+        получателя отдельно; возвращает флаги в порядке `tenants`.
+        """
+        leader = homework.group_leader(tenants)
+        try:
+            async with self.fetch_slots:
+                with timed('fetch'):
+                    api_response = await self.caller.call_async(
+                        get_api_answer_async, self.http, leader
+                    )
+        except Exception as error:
+            logging.error(f'Сбой в работе программы: {error}')
+            for tenant in tenants:
+                TENANT_POLLS.inc(tenant.tenant_id, 'error')
+            return [False] * len(tenants)
+        changed = [
+            await self.fan_out(tenant, api_response) for tenant in tenants
+        ]
+        if changed[tenants.index(leader)] is not None:
+            homework.RESPONSE_CACHE.confirm(leader, api_response)
+        return [bool(flag) for flag in changed]
+
+    async def fan_out(self, tenant, api_response):
+        """Разбирает ответ для получателя и отправляет изменения.
+
+        Возвращает флаг изменений или None при сбое.
+        """
+        try:
+            changes = homework.status_changes(tenant, api_response)
+            for homework_data, message in changes:
+                key = None
+                if message is not None:
+                    key = self.outbox.add(tenant, homework_data, message)
+                if key is not None:
+                    await self.deliver(tenant, [(key, message)])
+                self.store.record_status(tenant, homework_data)
+            self.store.record_cursor(
+                tenant, homework.next_cursor(tenant, api_response)
+            )
+            TENANT_POLLS.inc(tenant.tenant_id, 'ok')
+            return bool(changes)
+        except Exception as error:
+            logging.error(f'Сбой в работе программы: {error}')
+            TENANT_POLLS.inc(tenant.tenant_id, 'error')
+            return None
+
+    async def poll(self, tenants):
+        """Опрашивает получателей параллельно, по запросу на токен.
+
+        Возвращает флаги изменений в порядке `tenants`.
+        """
+        groups = homework.group_by_token(tenants)
+        results = await asyncio.gather(
+            *(self.poll_group(group) for group in groups)
+        )
+        flags = {
+            tenant.tenant_id: flag
+            for group, result in zip(groups, results)
+            for tenant, flag in zip(group, result)
+        }
+        return [flags[tenant.tenant_id] for tenant in tenants]
+
+    async def cycle(self, scheduler, registry, tenants, stop):
+        """Один цикл, как `homework.Poller.cycle`.
+
+        Возвращает False, если опрос прерван сигналом остановки.
+        """
+        if tenants is not None and tenants.changed():
+            homework.reload_tenants(
+                tenants, registry, self.store, self.outbox, scheduler
+            )
+        await self.redrive(registry)
+        due = homework.with_peers(scheduler.due(registry), registry)
+        changes = await finish(
+            asyncio.ensure_future(self.poll(due)), stop,
+            homework.SHUTDOWN_TIMEOUT
+        )
+        if changes is None:
+            return False
+        for tenant, changed in zip(due, changes):
+            scheduler.schedule(tenant, changed)
+        self.store.maybe_flush()
+        return True
+
+
+def client_session(limit):
+    """Сессия aiohttp с пулом соединений заданного размера."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=limit),
+        timeout=aiohttp.ClientTimeout(total=homework.TIMEOUT)
+    )
+
+
+async def wait_any(events, timeout):
+    """Ждет первого из событий не дольше `timeout`; True, если дождались."""
+    waiters = [asyncio.ensure_future(event.wait()) for event in events]
+    try:
+        done, _ = await asyncio.wait(
+            waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+    return bool(done)
+
+
+async def finish(task, stop, timeout):
+    """Результат задачи; после сигнала остановки ждет ее не дольше `timeout`.
+
+    Если задача не успела, она отменяется и возвращается None:
+    неотправленные сообщения остаются в outbox.
+    """
+    stopping = asyncio.ensure_future(stop.wait())
+    try:
+        await asyncio.wait(
+            (task, stopping), return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        stopping.cancel()
+    if not task.done():
+        await asyncio.wait((task,), timeout=timeout)
+    if not task.done():
+        logging.warning('Опрос не завершился к сроку остановки')
+        task.cancel()
+        return None
+    return task.result()
+
+
+async def run(registry, store, outbox):
+    """Цикл опроса в асинхронном режиме до сигнала остановки."""
+    loop = asyncio.get_running_loop()
+    stop, wake = asyncio.Event(), asyncio.Event()
+    signals = {signum: stop.set for signum in STOP_SIGNALS}
+    if WAKE_SIGNAL is not None:
+        signals[WAKE_SIGNAL] = wake.set
+    profiler = SignalProfiler(homework.PROFILE_DIR)
+    if PROFILE_SIGNAL is not None:
+        signals[PROFILE_SIGNAL] = profiler.toggle_profile
+        signals[SNAPSHOT_SIGNAL] = profiler.toggle_tracemalloc
+    for signum, handler in signals.items():
+        loop.add_signal_handler(signum, handler)
+    tenants = homework.watch_tenants(
+        lambda: loop.call_soon_threadsafe(wake.set)
+    )
+    try:
+        async with client_session(FETCH_CONCURRENCY) as http, \
+                client_session(SEND_CONCURRENCY) as telegram:
+            poller = AsyncPoller(http, telegram, store, outbox)
+            scheduler = homework.create_scheduler(registry)
+            started = time.monotonic()
+            while not stop.is_set():
+                SCHEDULER_LAG.set(time.monotonic() - started - scheduler.now)
+                try:
+                    with timed('cycle'):
+                        if not await poller.cycle(
+                            scheduler, registry, tenants, stop
+                        ):
+                            break
+                except Exception as error:
+                    logging.error(f'Сбой в работе программы: {error}')
+                wake.clear()
+                delay = scheduler.advance()
+                slept = time.monotonic()
+                if await wait_any((stop, wake), delay):
+                    scheduler.rewind(delay - (time.monotonic() - slept))
+        logging.info('Остановка: состояние сохраняется')
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        profiler.close()
+
+
+def main():
+    """Запуск бота в асинхронном режиме."""
+    homework.setup_logging()
+    if homework.check_tokens():
+        logging.critical('Токены не прошли валидацию')
+        sys.exit('Ошибка: Токены не прошли валидацию')
+    try:
+        registry = homework.load_tenants()
+    except TenantConfigError as error:
+        logging.critical(error)
+        sys.exit(f'Ошибка: {error}')
+    store = StateStore(homework.STATE_DB)
+    store.load_all(registry)
+    outbox = Outbox(homework.STATE_DB)
+    if homework.METRICS_PORT:
+        metrics.serve(homework.METRICS_PORT)
+    try:
+        asyncio.run(run(registry, store, outbox))
+    finally:
+        outbox.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
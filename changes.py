@@ -0,0 +1,123 @@
+"""Индекс статусов работ для поиска изменений в ответе API."""
+from datetime import datetime, timezone
+
+HOMEWORK_VERDICTS = {
+    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+    'reviewing': 'Работа взята на проверку ревьюером.',
+    'rejected': 'Работа проверена: у ревьюера есть замечания.'
+}
+# Коды статусов идут в порядке вердиктов: новые вердикты добавляются в
+# конец словаря, чтобы коды прежних статусов не менялись.
+STATUSES = tuple(HOMEWORK_VERDICTS)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES, 1)}
+UNKNOWN_STATUS = 0
+STATUS_BITS = len(STATUSES).bit_length()
+
+
+def homework_key(homework):
+    """Идентификатор работы: `id`, а если его нет — название."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def status_code(status):
+    """Компактный код статуса; неизвестные статусы получают 0."""
+    return STATUS_CODES.get(status, UNKNOWN_STATUS)
+
+
+def compact_key(key):
+    """Ключ работы для индекса: числовой `id` хранится как int."""
+    return int(key) if key.isdigit() and key[0] != '0' else key
+
+
+def date_code(date_updated):
+    """`date_updated` в секундах эпохи; None — 0, иной формат — как есть."""
+    if date_updated is None:
+        return 0
+    value = date_updated
+    try:
+        # Формат API разбирается вручную: это в разы быстрее strptime.
+        if len(value) != 20 or value[10] != 'T' or value[19] != 'Z':
+            return value
+        return int(datetime(
+            int(value[:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+            tzinfo=timezone.utc
+        ).timestamp())
+    except (TypeError, ValueError):
+        return value
+
+
+def pack(status, date_updated):
+    """Статус и дату изменения одним int: `дата << STATUS_BITS | код`."""
+    code, date = status_code(status), date_code(date_updated)
+    if isinstance(date, int):
+        return date << STATUS_BITS | code
+    return code, date
+
+
+def unpack_status(entry):
+    """Код статуса из упакованной записи."""
+    if isinstance(entry, int):
+        return entry & (1 << STATUS_BITS) - 1
+    return entry[0]
+
+
+class ChangeIndex:
+    """Последний известный статус каждой работы получателя.
+
+    Вместо текста сообщения хранит одно число на работу: код статуса и
+    `date_updated` в секундах; числовой `id` работы тоже хранится как int.
+    Даты в неожиданном формате хранятся парой (код, строка).
+    """
+
+    __slots__ = ('_seen',)
+
+    def __init__(self):
+        self._seen = {}
+
+    def diff(self, homeworks):
+        """Возвращает работы, чей статус или дата изменения новые.
+
+        Работы возвращаются от старых к новым, чтобы уведомления
+        приходили в порядке смены статусов.
+        """
+        return [
+            homework for homework in reversed(homeworks)
+            if self.changed(homework)
+        ]
+
+    def changed(self, homework):
+        """True, если статус или дата изменения работы новые."""
+        return self._seen.get(compact_key(homework_key(homework))) != pack(
+            homework.get('status'), homework.get('date_updated')
+        )
+
+    def update(self, homework):
+        """Запоминает статус работы; возвращает ее ключ."""
+        key = homework_key(homework)
+        self.restore(key, homework['status'], homework.get('date_updated'))
+        return key
+
+    def restore(self, key, status, date_updated):
+        """Записывает известный статус работы по ключу."""
+        self._seen[compact_key(key)] = pack(status, date_updated)
+
+    def status(self, key):
+        """Последний статус работы или None."""
+        entry = self._seen.get(compact_key(key))
+        if entry is None or not unpack_status(entry):
+            return None
+        return STATUSES[unpack_status(entry) - 1]
+
+    def count(self, status):
+        """Количество работ в заданном статусе."""
+        code = status_code(status)
+        return sum(
+            1 for entry in self._seen.values() if unpack_status(entry) == code
+        )
+
+    def __contains__(self, key):
+        return compact_key(key) in self._seen
+
+    def __len__(self):
+        return len(self._seen)
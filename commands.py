@@ -0,0 +1,109 @@
+"""Команды бота /status и /history по сохраненному состоянию."""
+import logging
+import threading
+import time
+
+STATUS_TITLES = {
+    'approved': 'принята',
+    'reviewing': 'на проверке',
+    'rejected': 'возвращена с замечаниями',
+}
+UNKNOWN_CHAT = 'Этот чат не подписан на уведомления о проверке работ.'
+NO_HOMEWORKS = 'Пока нет ни одной работы с известным статусом.'
+
+
+def describe(rows):
+    """Строки вида «дата — работа: статус»."""
+    return '\n'.join(
+        f'{date_updated or "—"} — {name}: '
+        f'{STATUS_TITLES.get(status, status)}'
+        for name, status, date_updated in rows
+    )
+
+
+class CommandHandler:
+    """Отвечает на команды из состояния бота, не обращаясь к API.
+
+    Если последний успешный опрос получателя был больше `ttl` секунд
+    назад, ответ все равно дается сразу из сохраненного состояния, а API
+    опрашивается в фоновом потоке: ожидание запроса не задерживает
+    остальные команды.
+    """
+
+    def __init__(self, registry, store, refresh, ttl,
+                 history_limit=10, clock=time.time):
+        self.registry = registry
+        self.store = store
+        self.refresh = refresh
+        self.ttl = ttl
+        self.history_limit = history_limit
+        self.clock = clock
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def tenant(self, chat_id):
+        """Получатель чата или None; устаревшие данные обновляются в фоне."""
+        tenant = self.registry.by_chat(chat_id)
+        if tenant is not None and (
+            tenant.checked is None or self.clock() - tenant.checked > self.ttl
+        ):
+            self.refresh_later(tenant)
+        return tenant
+
+    def refresh_later(self, tenant):
+        """Запускает фоновый опрос получателя, если он еще не идет."""
+        with self._lock:
+            if tenant.tenant_id in self._refreshing:
+                return
+            self._refreshing.add(tenant.tenant_id)
+        logging.debug('Данные для команды устарели, опрашиваем API в фоне')
+        threading.Thread(
+            target=self._refresh, args=(tenant,), name='refresh', daemon=True
+        ).start()
+
+    def _refresh(self, tenant):
+        try:
+            self.refresh(tenant)
+        except Exception as error:
+            logging.error(f'Сбой при обновлении данных для команды: {error}')
+        finally:
+            with self._lock:
+                self._refreshing.discard(tenant.tenant_id)
+
+    def status(self, chat_id):
+        """Ответ на /status: текущий статус каждой работы."""
+        tenant = self.tenant(chat_id)
+        if tenant is None:
+            return UNKNOWN_CHAT
+        rows = self.store.statuses(tenant)
+        if not rows:
+            return NO_HOMEWORKS
+        return 'Статусы работ:\n' + describe(rows)
+
+    def history(self, chat_id):
+        """Ответ на /history: последние смены статусов."""
+        tenant = self.tenant(chat_id)
+        if tenant is None:
+            return UNKNOWN_CHAT
+        rows = self.store.history(tenant, self.history_limit)
+        if not rows:
+            return NO_HOMEWORKS
+        return 'Последние изменения:\n' + describe(rows)
+
+    def register(self, bot):
+        """Подключает команды к обработчикам сообщений бота."""
+        for command, answer in (
+            ('status', self.status), ('history', self.history)
+        ):
+            bot.register_message_handler(
+                self._replier(bot, answer), commands=[command]
+            )
+
+    @staticmethod
+    def _replier(bot, answer):
+        def reply(message):
+            try:
+                bot.reply_to(message, answer(message.chat.id))
+            except Exception as error:
+                logging.error(f'Сбой при ответе на команду: {error}')
+        return reply
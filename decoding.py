@@ -0,0 +1,52 @@
+"""Декодирование JSON: быстрый orjson, если установлен, иначе stdlib."""
+import json
+import os
+
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+BACKENDS = ('auto', 'orjson', 'json')
+
+
+def find_orjson():
+    """Модуль orjson или None, если он не установлен."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def stdlib_loads(data):
+    """Декодирование стандартной библиотекой."""
+    return json.loads(data)
+
+
+def orjson_backend(orjson):
+    """Декодирование orjson с откатом на stdlib при ошибке.
+
+    orjson строже stdlib (NaN, не UTF-8), поэтому ответ, который он не
+    разобрал, декодируется повторно: ошибка остается той же
+    `json.JSONDecodeError`, а допустимые для stdlib данные не теряются.
+    """
+    def loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+    return loads
+
+
+def select_loads(backend=JSON_BACKEND):
+    """Функция декодирования для выбранного бэкенда."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Неизвестный бэкенд JSON: {backend}')
+    orjson = None if backend == 'json' else find_orjson()
+    if orjson is None:
+        return stdlib_loads
+    return orjson_backend(orjson)
+
+
+def loads(data):
+    """Декодирует JSON; бэкенд выбирается и импортируется при первом вызове."""
+    global loads
+    loads = select_loads()
+    return loads(data)
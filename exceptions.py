@@ -1,3 +1,34 @@
 class ApiCodeError(Exception):
-    def __init__(self, message="Ошибка доступа к API"):
-        super().__init__(message)
\ No newline at end of file
+    def __init__(self, message="Ошибка доступа к API", status_code=None,
+                 retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ApiCodeError):
+    def __init__(self, message="API временно не опрашивается после сбоев",
+                 retry_after=None):
+        super().__init__(message, retry_after=retry_after)
+
+
+class TenantConfigError(Exception):
+    def __init__(self, message="Ошибка в конфигурации получателей"):
+        super().__init__(message)
+
+
+class SendMessageError(Exception):
+    def __init__(self, message="Сбой при отправке сообщения",
+                 retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ShutdownRequested(Exception):
+    def __init__(self, message="Получен сигнал остановки"):
+        super().__init__(message)
+
+
+class WakeUp(Exception):
+    def __init__(self, message="Ожидание прервано для внеочередного опроса"):
+        super().__init__(message)
@@ -1,48 +1,104 @@
+import atexit
+import itertools
 import json
 import logging
 import os
 import sys
+import threading
 import time
+from contextlib import ExitStack
 from http import HTTPStatus
+from operator import attrgetter
 
-import requests
-from dotenv import load_dotenv
-from telebot import TeleBot
-
-from exceptions import ApiCodeError
+from startup import PROFILE  # первым, чтобы замерить импорт остальных
 
+from dotenv import load_dotenv
 
-logging.basicConfig(
-    filename='bot_log.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+import decoding
+import metrics
+from changes import HOMEWORK_VERDICTS, homework_key
+from commands import CommandHandler
+from exceptions import (
+    ApiCodeError, SendMessageError, ShutdownRequested, TenantConfigError,
+    WakeUp
 )
+from http_cache import ResponseCache
+from lifecycle import Lifecycle
+from logs import file_handler, queue_logging, worker_log_file
+from metrics import SCHEDULER_LAG, TENANT_POLLS, timed
+from outbound import SendQueue, telegram_retry_after
+from outbox import Outbox
+from profiling import SignalProfiler
+from resilience import ResilientCaller, parse_retry_after
+from scheduler import AdaptiveScheduler
+from sharding import Shard
+from state import StateStore
+from streaming import StreamedAnswer
+from tenants import (
+    Tenant, TenantFile, TenantRegistry, activate, current_tenant
+)
+
 
 load_dotenv()
 
+LOG_FILE = os.getenv('LOG_FILE', 'bot_log.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_JSON = os.getenv('LOG_JSON') == '1'
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+log_listener = None
+
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('CHAT_ID')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+TENANTS_RELOAD_INTERVAL = int(os.getenv('TENANTS_RELOAD_INTERVAL', 10))
+STATE_DB = os.getenv('STATE_DB', 'bot_state.sqlite3')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
 
 RETRY_PERIOD = 600
 TIMEOUT = 10
+CURSOR_OVERLAP = 60
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 120))
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 3600))
+POLL_HOURLY_BUDGET = int(os.getenv('POLL_HOURLY_BUDGET', 0))
+POLL_START_RATE = float(os.getenv('POLL_START_RATE', 20))
+STREAM_HISTORY = os.getenv('STREAM_HISTORY') == '1'
+STREAM_CHUNK_SIZE = 64 * 1024
+BOT_COMMANDS = os.getenv('BOT_COMMANDS') == '1'
+COMMAND_CACHE_TTL = int(os.getenv('COMMAND_CACHE_TTL', 300))
+SHUTDOWN_TIMEOUT = int(os.getenv('SHUTDOWN_TIMEOUT', 20))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+SHARD_WORKER = os.getenv('SHARD_WORKER')
+POLL_THREADS = int(os.getenv('POLL_THREADS', 0))
+LEASE_TTL = int(os.getenv('LEASE_TTL', 30))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+RESPONSE_CACHE = ResponseCache()
+HTTP_SESSION = None
+
+
+def setup_logging():
+    """Включает запись логов в файл через очередь; повторно не действует."""
+    global log_listener
+    if log_listener is not None:
+        return
+    log_handler, log_listener = queue_logging(
+        file_handler(
+            worker_log_file(LOG_FILE, SHARD_WORKER), when=LOG_ROTATE_WHEN
+        ),
+        json_lines=LOG_JSON
+    )
+    logging.basicConfig(level=LOG_LEVEL, handlers=[log_handler])
+    atexit.register(log_listener.stop)
 
 
 def check_tokens():
     """Проверка доступности переменных окружения."""
-    tokens = {
-        'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
-        'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
-        'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID
-    }
+    tokens = {'TELEGRAM_TOKEN': TELEGRAM_TOKEN}
+    if not TENANTS_FILE:
+        tokens['PRACTICUM_TOKEN'] = PRACTICUM_TOKEN
+        tokens['TELEGRAM_CHAT_ID'] = TELEGRAM_CHAT_ID
     result_messages = []
     for token, value in tokens.items():
         if value is None:
@@ -53,37 +109,109 @@ def check_tokens():
 
 
 def send_message(bot, message):
-    """Отправляет сообщение в Telegram-чат, определяемый константой."""
+    """Отправляет сообщение в Telegram-чат текущего получателя."""
+    tenant = current_tenant.get()
+    chat_id = TELEGRAM_CHAT_ID if tenant is None else tenant.chat_id
     logging.debug('Начало отправки сообщения в Telegram')
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id=chat_id, text=message)
         logging.debug('Удачная отправка сообщения')
-    except Exception:
+    except Exception as error:
         logging.error('Сбой при отправке сообщения')
+        raise SendMessageError(
+            retry_after=telegram_retry_after(
+                getattr(error, 'result_json', None)
+            )
+        ) from error
+
+
+def read_payload(response, tenant, timestamp):
+    """Данные ответа 200; неизменный ответ берется из кэша.
+
+    Заглушки ответа без тела и заголовков просто декодируются.
+    """
+    body = getattr(response, 'content', None)
+    headers = getattr(response, 'headers', None)
+    if not isinstance(body, bytes) or headers is None:
+        return response.json()
+    return RESPONSE_CACHE.store(
+        tenant, timestamp, headers, body, decoding.loads
+    )
 
 
 def get_api_answer(timestamp):
-    """Запрос к эндпоинту API-сервиса."""
+    """Запрос к эндпоинту API-сервиса от имени текущего получателя."""
+    import requests
+
+    tenant = current_tenant.get()
+    headers = HEADERS if tenant is None else tenant.headers
+    get = requests.get if HTTP_SESSION is None else HTTP_SESSION.get
     try:
-        response = requests.get(
+        response = get(
             ENDPOINT,
-            headers=HEADERS,
+            headers=RESPONSE_CACHE.request_headers(
+                tenant, timestamp, headers
+            ),
             params={'from_date': timestamp},
             timeout=TIMEOUT
         )
     except requests.exceptions.RequestException:
         raise ApiCodeError('API недоступно')
 
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        cached = RESPONSE_CACHE.replay(tenant, timestamp)
+        if cached is not None:
+            logging.info('Ответ API не изменился')
+            return cached
     if response.status_code == HTTPStatus.OK:
         logging.info('API доступно')
         try:
-            response = response.json()
+            response = read_payload(response, tenant, timestamp)
             logging.info('Данные успешно получены')
             return response
         except json.decoder.JSONDecodeError:
             msg = 'Ошибка получения данных'
             raise json.decoder.JSONDecodeError(f'{msg}')
-    raise ApiCodeError
+    raise api_error(response)
+
+
+def api_error(response):
+    """Исключение для ответа API с неуспешным кодом."""
+    retry_after = None
+    if response.status_code in (
+        HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE
+    ):
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    return ApiCodeError(
+        f'Ошибка доступа к API: код {response.status_code}',
+        response.status_code,
+        retry_after
+    )
+
+
+def stream_api_answer(timestamp):
+    """Запрос к API, тело которого читается потоком по мере разбора."""
+    import requests
+
+    tenant = current_tenant.get()
+    get = requests.get if HTTP_SESSION is None else HTTP_SESSION.get
+    try:
+        response = get(
+            ENDPOINT,
+            headers=HEADERS if tenant is None else tenant.headers,
+            params={'from_date': timestamp},
+            timeout=TIMEOUT,
+            stream=True
+        )
+    except requests.exceptions.RequestException:
+        raise ApiCodeError('API недоступно')
+    if response.status_code != HTTPStatus.OK:
+        response.close()
+        raise api_error(response)
+    logging.info('API доступно, история читается потоком')
+    return StreamedAnswer(
+        response.iter_content(STREAM_CHUNK_SIZE), response.close
+    )
 
 
 def check_response(response):
@@ -120,34 +248,506 @@ def parse_status(homework):
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def load_tenants():
+    """Возвращает реестр получателей из файла или из окружения."""
+    if TENANTS_FILE:
+        return TenantRegistry.from_file(TENANTS_FILE)
+    return TenantRegistry([Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)])
+
+
+def group_by_token(tenants):
+    """Группы получателей с общим токеном Практикума."""
+    groups = {}
+    for tenant in tenants:
+        groups.setdefault(tenant.practicum_token, []).append(tenant)
+    return list(groups.values())
+
+
+def with_peers(due, registry):
+    """Получатели `due` и все, у кого тот же токен.
+
+    Тогда на токен уходит один запрос за цикл, а расписание получателей
+    с общим токеном не расходится. Соседи берутся из индекса токенов
+    реестра, поэтому цикл не обходит реестр целиком.
+    """
+    tokens = dict.fromkeys(tenant.practicum_token for tenant in due)
+    return [
+        peer for token in tokens for peer in registry.with_token(token)
+    ]
+
+
+def group_leader(tenants):
+    """Получатель группы, от имени которого идет общий запрос."""
+    return min(tenants, key=attrgetter('timestamp'))
+
+
+def watch_tenants(on_change):
+    """Следит за `TENANTS_FILE`; None, если получатели из окружения."""
+    if not TENANTS_FILE:
+        return None
+    source = TenantFile(TENANTS_FILE)
+    source.watch(TENANTS_RELOAD_INTERVAL, on_change)
+    return source
+
+
+def reload_tenants(source, registry, store, outbox, scheduler):
+    """Применяет изменения файла получателей к работающему боту.
+
+    Новые получатели получают сохраненное состояние. У удаленных
+    сбрасывается расписание, кэш ответов, состояние и неотправленные
+    уведомления, у измененных — кэш ответов, выданных по старому токену.
+    """
+    added, removed, updated = source.reload(registry)
+    for tenant in added:
+        store.load(tenant)
+    scheduler.add(added)
+    for tenant in removed:
+        scheduler.forget(tenant)
+        store.forget(tenant)
+        outbox.forget(tenant)
+    for tenant in removed + updated:
+        RESPONSE_CACHE.forget(tenant)
+    if added or removed or updated:
+        logging.info(
+            f'Получатели обновлены: добавлено {len(added)}, '
+            f'удалено {len(removed)}, изменено {len(updated)}'
+        )
+
+
+def status_changes(tenant, api_response):
+    """Возвращает пары (работа, сообщение) для изменившихся статусов.
+
+    Сообщение None означает, что статус нужно записать без уведомления.
+    """
+    if RESPONSE_CACHE.unchanged(tenant, api_response):
+        logging.debug('Ответ API не изменился с прошлого опроса')
+        return []
+    with timed('validate'):
+        valid = check_response(api_response)
+    if not valid:
+        return []
+    homeworks = api_response['homeworks']
+    if not homeworks:
+        logging.debug('Получен пустой список с дз')
+        return []
+    if is_first_poll(tenant):
+        changes = list(history_changes(tenant, homeworks))
+    else:
+        changes = list(parse_changes(tenant, tenant.index.diff(homeworks)))
+    if not changes:
+        logging.debug('Статусы работ не изменились')
+    return changes
+
+
+def parse_changes(tenant, homeworks):
+    """Генератор пар (работа, сообщение) для работ с новым статусом."""
+    for homework in homeworks:
+        if not tenant.index.changed(homework):
+            continue
+        try:
+            with timed('parse'):
+                message = parse_status(homework)
+        except ValueError as error:
+            logging.error(
+                f'Сбой в работе программы: {error}',
+                extra={'homework_id': homework_key(homework)}
+            )
+            continue
+        yield homework, message
+
+
+def is_first_poll(tenant):
+    """У получателя еще нет ни курсора, ни известных статусов."""
+    return not tenant.timestamp and not len(tenant.index)
+
+
+def history_changes(tenant, homeworks):
+    """Пары первого опроса: уведомление только о новейшей работе.
+
+    `homeworks` идут в порядке API, от новых к старым. Прошлые статусы
+    остальных работ не новость: они записываются с сообщением None.
+    """
+    homeworks = iter(homeworks)
+    yield from parse_changes(tenant, itertools.islice(homeworks, 1))
+    for homework, _ in parse_changes(tenant, homeworks):
+        yield homework, None
+
+
+def next_cursor(tenant, api_response):
+    """Следующий `from_date` по серверному времени ответа.
+
+    Курсор отстает от `current_date` на `CURSOR_OVERLAP` секунд, чтобы не
+    пропустить записи на границе окна; повторы отсекает `status_changes`.
+    """
+    current_date = api_response.get('current_date')
+    if not isinstance(current_date, int):
+        return tenant.timestamp
+    return max(current_date - CURSOR_OVERLAP, tenant.timestamp)
+
+
+class Poller:
+    """Опрашивает API для получателей и отправляет уведомления."""
+
+    def __init__(self, sender, store, outbox, caller=None, shard=None,
+                 pool=None, tenants=None):
+        """Связывает очередь отправки, хранилища и политику повторов.
+
+        С `shard` опрашиваются только получатели, арендованные воркером,
+        а с пулом потоков `pool` получатели опрашиваются параллельно.
+        Если задан файл получателей `tenants`, его изменения применяются
+        в начале цикла.
+        """
+        self.sender = sender
+        self.store = store
+        self.outbox = outbox
+        self.caller = caller or ResilientCaller()
+        self.shard = shard
+        self.pool = pool
+        self.tenants = tenants
+        self._locks = {}
+        self._running = 0
+        self._idle = threading.Condition()
+
+    def poll_tenant(self, tenant):
+        """Опрашивает API для одного получателя и сообщает об изменениях.
+
+        Возвращает True, если у получателя изменился статус хотя бы одной
+        работы. Опросы одного получателя из цикла и из команд бота
+        не пересекаются.
+        """
+        with self.lock(tenant), activate(tenant):
+            try:
+                if STREAM_HISTORY and not tenant.timestamp:
+                    changed = self.poll_streaming(tenant)
+                else:
+                    changed = self.poll_answer(tenant)
+                TENANT_POLLS.inc(tenant.tenant_id, 'ok')
+                return changed
+            except Exception as error:
+                logging.error(f'Сбой в работе программы: {error}')
+                TENANT_POLLS.inc(tenant.tenant_id, 'error')
+                return False
+
+    def poll_group(self, tenants):
+        """Один запрос к API на всех получателей с общим токеном.
+
+        Ответ разбирается для каждого получателя по его индексу статусов,
+        поэтому уведомления и курсоры у всех свои. Запрос идет с самым
+        ранним курсором группы. Возвращает флаги изменений в порядке
+        `tenants`.
+        """
+        leader = group_leader(tenants)
+        if len(tenants) == 1 or (STREAM_HISTORY and not leader.timestamp):
+            return [self.poll_tenant(tenant) for tenant in tenants]
+        with ExitStack() as locks:
+            for tenant in sorted(tenants, key=attrgetter('tenant_id')):
+                locks.enter_context(self.lock(tenant))
+            try:
+                with activate(leader), timed('fetch'):
+                    api_response = self.caller.call(
+                        get_api_answer, leader.timestamp
+                    )
+            except Exception as error:
+                logging.error(f'Сбой в работе программы: {error}')
+                for tenant in tenants:
+                    TENANT_POLLS.inc(tenant.tenant_id, 'error')
+                return [False] * len(tenants)
+            changed = [
+                self.fan_out(tenant, api_response) for tenant in tenants
+            ]
+        if changed[tenants.index(leader)] is not None:
+            RESPONSE_CACHE.confirm(leader, api_response)
+        return [bool(flag) for flag in changed]
+
+    def fan_out(self, tenant, api_response):
+        """Разбирает общий ответ для получателя; None при сбое."""
+        with activate(tenant):
+            try:
+                changed = self.apply_answer(tenant, api_response)
+                TENANT_POLLS.inc(tenant.tenant_id, 'ok')
+                return changed
+            except Exception as error:
+                logging.error(f'Сбой в работе программы: {error}')
+                TENANT_POLLS.inc(tenant.tenant_id, 'error')
+                return None
+
+    def lock(self, tenant):
+        """Блокировка, которая не дает опрашивать получателя дважды."""
+        return self._locks.setdefault(tenant.tenant_id, threading.Lock())
+
+    def cycle(self, scheduler, registry, lifecycle):
+        """Один цикл: повтор outbox, опрос, отправка и запись состояния.
+
+        После сигнала остановки новые получатели не опрашиваются.
+        """
+        if self.tenants is not None and self.tenants.changed():
+            reload_tenants(
+                self.tenants, registry, self.store, self.outbox, scheduler
+            )
+        if self.shard is not None:
+            registry = self.shard.claim(registry, self.store, scheduler)
+        redrive(self.outbox, self.sender, registry)
+        due = with_peers(scheduler.due(registry), registry)
+        for tenant, changed in self.poll_all(due, lifecycle):
+            if changed is not None:
+                scheduler.schedule(tenant, changed)
+        self.drain(lifecycle)
+        self.store.maybe_flush()
+
+    def drain(self, lifecycle):
+        """Ждет отправки уведомлений цикла.
+
+        Сигнал остановки прерывает ожидание, и очередь дальше разбирает
+        `close` со своим сроком.
+        """
+        while True:
+            try:
+                with lifecycle.sleeping():
+                    self.sender.join()
+                return
+            except WakeUp:
+                continue
+
+    def poll_all(self, tenants, lifecycle):
+        """Пары (получатель, флаг изменений); None — пропущен при остановке.
+
+        Получатели с общим токеном опрашиваются одним запросом. Без пула
+        группы опрашиваются по очереди. С пулом опросы идут параллельно,
+        а заполненная очередь отправки их притормаживает.
+        """
+        def poll(group):
+            if lifecycle.stopping:
+                return [(tenant, None) for tenant in group]
+            with self._idle:
+                self._running += 1
+            try:
+                return list(zip(group, self.poll_group(group)))
+            finally:
+                with self._idle:
+                    self._running -= 1
+                    self._idle.notify_all()
+
+        groups = group_by_token(tenants)
+        if self.pool is None:
+            results = map(poll, groups)
+        else:
+            results = self.pool.map(poll, groups)
+        return itertools.chain.from_iterable(results)
+
+    def close(self, timeout=None):
+        """Дожидается отправки, записывает состояние и отпускает аренды.
+
+        Идущие опросы и очередь отправки ждут не дольше общего `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            return max(deadline - time.monotonic(), 0)
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        with self._idle:
+            if not self._idle.wait_for(
+                lambda: not self._running, remaining()
+            ):
+                logging.warning('Опрос не завершился к сроку остановки')
+        self.sender.close(timeout=remaining())
+        self.outbox.close()
+        self.store.close()
+        if self.shard is not None:
+            self.shard.close()
+
+    def poll_answer(self, tenant):
+        """Опрос с разбором всего ответа API целиком."""
+        with timed('fetch'):
+            api_response = self.caller.call(get_api_answer, tenant.timestamp)
+        changed = self.apply_answer(tenant, api_response)
+        RESPONSE_CACHE.confirm(tenant, api_response)
+        return changed
+
+    def apply_answer(self, tenant, api_response):
+        """Отправляет изменения из ответа API и сдвигает курсор."""
+        changes = status_changes(tenant, api_response)
+        self.notify(tenant, changes)
+        self.store.record_cursor(tenant, next_cursor(tenant, api_response))
+        return bool(changes)
+
+    def poll_streaming(self, tenant):
+        """Опрос с чтением истории по одной работе.
+
+        Как и при обычном первом опросе, уведомление приходит только о
+        новейшей работе, а остальная история записывается молча.
+        """
+        with timed('fetch'):
+            answer = self.caller.call(stream_api_answer, tenant.timestamp)
+        select = history_changes if is_first_poll(tenant) else parse_changes
+        with answer:
+            changed = self.notify(tenant, select(tenant, answer.homeworks()))
+        self.store.record_cursor(tenant, next_cursor(tenant, answer.fields))
+        return changed
+
+    def notify(self, tenant, changes):
+        """Записывает изменения в outbox и ставит их в очередь отправки."""
+        changed = False
+        for homework, message in changes:
+            key = None
+            if message is not None:
+                key = self.outbox.add(tenant, homework, message)
+            if key is not None:
+                self.sender.put(tenant, message, key)
+            self.store.record_status(tenant, homework)
+            changed = True
+        return changed
+
+
+def redrive(outbox, sender, registry):
+    """Повторно ставит в очередь неподтвержденные уведомления."""
+    for key, tenant_id, message in outbox.pending():
+        tenant = registry.get(tenant_id)
+        if tenant is not None:
+            sender.put(tenant, message, key)
+    outbox.prune()
+
+
+def start_commands(bot, registry, store, poller):
+    """Включает ответы на /status и /history в фоновом потоке."""
+    CommandHandler(
+        registry, store, poller.poll_tenant, COMMAND_CACHE_TTL
+    ).register(bot)
+    threading.Thread(
+        target=bot.infinity_polling, kwargs={'skip_pending': True},
+        name='commands', daemon=True
+    ).start()
+
+
+def create_scheduler(tenants=()):
+    """Планировщик опроса с интервалами из настроек и получателями."""
+    scheduler = AdaptiveScheduler(
+        RETRY_PERIOD, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL,
+        hourly_budget=POLL_HOURLY_BUDGET, start_rate=POLL_START_RATE
+    )
+    scheduler.add(tenants)
+    return scheduler
+
+
+def create_session(size):
+    """Общая сессия requests с пулом из `size` соединений к API."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def create_poller(sender, store, outbox, lifecycle):
+    """Poller для режима запуска: с пулом потоков и долей воркера."""
+    global HTTP_SESSION
+    pool = None
+    if POLL_THREADS:
+        from concurrent.futures import ThreadPoolExecutor
+
+        HTTP_SESSION = create_session(POLL_THREADS)
+        pool = ThreadPoolExecutor(POLL_THREADS, thread_name_prefix='poll')
+    return Poller(
+        sender, store, outbox,
+        caller=ResilientCaller(stopping=lambda: lifecycle.stopping),
+        shard=create_shard(lifecycle), pool=pool,
+        tenants=watch_tenants(lifecycle.wake)
+    )
+
+
+def create_shard(lifecycle):
+    """Доля получателей воркера супервизора или None вне его."""
+    if not SHARD_WORKER:
+        return None
+    shard = Shard(STATE_DB, SHARD_WORKER, LEASE_TTL, on_change=lifecycle.wake)
+    shard.start()
+    return shard
+
+
+def run_cycle(poller, scheduler, registry, lifecycle):
+    """Цикл опроса, сбой которого пишется в лог, а не останавливает бота.
+
+    Остановка и пробуждение по сигналам передаются главному циклу.
+    """
+    try:
+        with timed('cycle'):
+            poller.cycle(scheduler, registry, lifecycle)
+    except (ShutdownRequested, WakeUp):
+        raise
+    except Exception as error:
+        logging.error(f'Сбой в работе программы: {error}')
+
+
 def main():
     """Основная логика работы бота."""
+    setup_logging()
     if check_tokens():
         logging.critical('Токены не прошли валидацию')
         sys.exit('Ошибка: Токены не прошли валидацию')
 
+    try:
+        registry = load_tenants()
+    except TenantConfigError as error:
+        logging.critical(error)
+        sys.exit(f'Ошибка: {error}')
+    PROFILE.mark('настройки и логи')
+
+    store = StateStore(STATE_DB)
+    store.load_all(registry)
+    PROFILE.mark('загрузка состояния')
+    from telebot import TeleBot
+    PROFILE.mark('импорт telebot')
     bot = TeleBot(token=TELEGRAM_TOKEN)
-    timestamp = 0
-    last_status = None
-
-    while True:
-        try:
-            api_response = get_api_answer(timestamp)
-            if check_response(api_response):
-                if not api_response['homeworks']:
-                    logging.debug('Получен пустой список с дз')
-                else:
-                    last_homework = api_response['homeworks'][0]
-                    current_status = parse_status(last_homework)
-                    if last_status != current_status:
-                        send_message(bot, current_status)
-                        last_status = current_status
-            timestamp = int(time.time())
-        except Exception as error:
-            logging.error(f'Сбой в работе программы: {error}')
-        finally:
-            time.sleep(RETRY_PERIOD)
+    outbox = Outbox(STATE_DB)
+    sender = SendQueue(bot, send_message, on_result=outbox.settle)
+    lifecycle = Lifecycle()
+    lifecycle.install()
+    profiler = SignalProfiler(PROFILE_DIR)
+    profiler.install()
+    poller = create_poller(sender, store, outbox, lifecycle)
+    # Воркер шарда ставит получателей в расписание по мере аренды.
+    scheduler = create_scheduler(registry if poller.shard is None else ())
+    if BOT_COMMANDS:
+        start_commands(bot, registry, store, poller)
+    PROFILE.mark('бот, outbox и очередь отправки')
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    started = time.monotonic()
 
+    try:
+        while True:
+            try:
+                SCHEDULER_LAG.set(time.monotonic() - started - scheduler.now)
+                run_cycle(poller, scheduler, registry, lifecycle)
+                PROFILE.finish('первый цикл опроса')
+            finally:
+                delay = scheduler.advance()
+                slept = time.monotonic()
+                try:
+                    with lifecycle.sleeping():
+                        time.sleep(delay)
+                except WakeUp:
+                    scheduler.rewind(delay - (time.monotonic() - slept))
+    except ShutdownRequested:
+        logging.info('Остановка: дожидаемся отправки и сохраняем состояние')
+    finally:
+        poller.close(timeout=SHUTDOWN_TIMEOUT)
+        profiler.uninstall()
+        lifecycle.uninstall()
+
+
+PROFILE.mark('импорт homework')
 
 if __name__ == '__main__':
-    main()
+    PROFILE.enabled = '--startup-profile' in sys.argv[1:]
+    try:
+        main()
+    finally:
+        # Отчет нужен и тогда, когда бот не дошел до первого цикла.
+        PROFILE.finish('остановка до первого цикла')
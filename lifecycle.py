@@ -0,0 +1,78 @@
+"""Прерываемое ожидание главного цикла и мягкая остановка по сигналам."""
+import logging
+import signal
+import threading
+from contextlib import contextmanager
+
+from exceptions import ShutdownRequested, WakeUp
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+WAKE_SIGNAL = getattr(signal, 'SIGHUP', None)
+
+
+class Lifecycle:
+    """Сигналы остановки и пробуждения для главного цикла.
+
+    Сигнал во время ожидания сразу прерывает его исключением; сигнал во
+    время опроса только отмечает остановку, и цикл завершается после
+    текущего получателя, не обрывая отправку посередине.
+    """
+
+    def __init__(self, stop_signals=STOP_SIGNALS, wake_signal=WAKE_SIGNAL):
+        self.stop_signals = stop_signals
+        self.wake_signal = wake_signal
+        self.stopping = False
+        self._sleeping = False
+        self._previous = {}
+
+    def install(self):
+        """Ставит обработчики сигналов (только в главном потоке)."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        handlers = {signum: self._stop for signum in self.stop_signals}
+        if self.wake_signal is not None:
+            handlers[self.wake_signal] = self._wake
+        for signum, handler in handlers.items():
+            self._previous[signum] = signal.signal(signum, handler)
+
+    def uninstall(self):
+        """Возвращает прежние обработчики сигналов."""
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+
+    def stop(self):
+        """Просит цикл завершиться, как при SIGTERM."""
+        self._stop(signal.SIGTERM, None)
+
+    def wake(self):
+        """Прерывает ожидание главного потока для внеочередного опроса."""
+        if self.wake_signal in self._previous:
+            signal.pthread_kill(
+                threading.main_thread().ident, self.wake_signal
+            )
+
+    @contextmanager
+    def sleeping(self):
+        """Участок, где ожидание можно прервать сигналом."""
+        if self.stopping:
+            raise ShutdownRequested()
+        self._sleeping = True
+        try:
+            yield
+        finally:
+            self._sleeping = False
+
+    def _stop(self, signum, frame):
+        if not self.stopping:
+            logging.warning(
+                f'Получен сигнал {signal.Signals(signum).name}, '
+                f'завершаем работу'
+            )
+        self.stopping = True
+        if self._sleeping:
+            raise ShutdownRequested()
+
+    def _wake(self, signum, frame):
+        if self._sleeping:
+            raise WakeUp()
@@ -0,0 +1,143 @@
+"""Логирование через очередь: запись в файл в отдельном потоке."""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from tenants import current_tenant
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+THROTTLED_PREFIXES = ('Сбой в работе программы',)
+
+
+class TenantContextFilter(logging.Filter):
+    """Добавляет в запись идентификатор текущего получателя."""
+
+    def filter(self, record):
+        """Дополняет запись полем `tenant_id`."""
+        if not hasattr(record, 'tenant_id'):
+            tenant = current_tenant.get()
+            record.tenant_id = None if tenant is None else tenant.tenant_id
+        return True
+
+
+class RepeatFilter(logging.Filter):
+    """Пропускает не больше `burst` одинаковых ошибок за `period` секунд.
+
+    Ограничение касается только сообщений с префиксами из `prefixes`;
+    число подавленных повторов дописывается к следующей пропущенной записи.
+    """
+
+    def __init__(self, prefixes=THROTTLED_PREFIXES, burst=5, period=60,
+                 clock=time.monotonic):
+        super().__init__()
+        self.prefixes = prefixes
+        self.burst = burst
+        self.period = period
+        self.clock = clock
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Решает, пропустить ли запись."""
+        message = record.getMessage()
+        if not message.startswith(self.prefixes):
+            return True
+        with self._lock:
+            now = self.clock()
+            if len(self._windows) > 1000:
+                self._forget_expired(now)
+            started, passed, suppressed = self._windows.get(
+                message, (now, 0, 0)
+            )
+            if now - started >= self.period:
+                started, passed = now, 0
+            if passed >= self.burst:
+                self._windows[message] = (started, passed, suppressed + 1)
+                return False
+            self._windows[message] = (started, passed + 1, 0)
+        if suppressed:
+            record.msg = f'{message} (подавлено повторов: {suppressed})'
+            record.args = None
+        return True
+
+    def _forget_expired(self, now):
+        self._windows = {
+            message: window for message, window in self._windows.items()
+            if now - window[0] < self.period
+        }
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON с контекстом получателя."""
+
+    def format(self, record):
+        """Сериализует запись в JSON."""
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'tenant': getattr(record, 'tenant_id', None),
+        }
+        homework_id = getattr(record, 'homework_id', None)
+        if homework_id is not None:
+            entry['homework'] = homework_id
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Не блокирует поток при переполненной очереди, а отбрасывает запись."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        """Кладет запись в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def worker_log_file(path, worker):
+    """Отдельный файл лога воркера: bot_log.log -> bot_log.worker-0.log.
+
+    Ротировать один файл из нескольких процессов нельзя, поэтому у
+    каждого процесса свой файл.
+    """
+    if not worker:
+        return path
+    root, extension = os.path.splitext(path)
+    return f'{root}.{worker}{extension}'
+
+
+def file_handler(path, max_bytes=10 * 2 ** 20, backup_count=5, when=None):
+    """Файловый обработчик с ротацией по размеру или по времени."""
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8'
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+
+
+def queue_logging(target, json_lines=False, maxsize=10000):
+    """Обработчик для корневого логгера и поток, пишущий в `target`.
+
+    Возвращает пару (обработчик, слушатель); слушатель уже запущен,
+    при завершении его нужно остановить, чтобы дописать очередь.
+    """
+    target.setFormatter(
+        JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT)
+    )
+    handler = DroppingQueueHandler(queue.Queue(maxsize))
+    handler.addFilter(TenantContextFilter())
+    handler.addFilter(RepeatFilter())
+    listener = logging.handlers.QueueListener(handler.queue, target)
+    listener.start()
+    return handler, listener
@@ -0,0 +1,246 @@
+"""Метрики бота в текстовом формате Prometheus."""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+
+def format_labels(names, values):
+    """Метки в синтаксисе Prometheus: {name="value",...}."""
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонно растущий счетчик с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Увеличивает значение для набора меток."""
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount
+            )
+
+    def value(self, *label_values):
+        """Текущее значение для набора меток."""
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        """Строки экспозиции метрики."""
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            yield (
+                f'{self.name}{format_labels(self.labels, label_values)} '
+                f'{value}'
+            )
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        """Устанавливает значение для набора меток."""
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Распределение длительностей по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Учитывает одно наблюдение."""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def count(self, *label_values):
+        """Количество наблюдений для набора меток."""
+        series = self._series.get(label_values)
+        return 0 if series is None else sum(series[0])
+
+    def render(self):
+        """Строки экспозиции: накопленные корзины, сумма и количество."""
+        with self._lock:
+            items = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._series.items()
+            ]
+        names = self.labels + ('le',)
+        for label_values, counts, total in items:
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = format_labels(names, label_values + (bound,))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику в экспозицию и возвращает ее."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'homework_bot_stage_seconds', 'Длительность этапа обработки',
+    ('stage',)
+))
+STAGE_TOTAL = REGISTRY.register(Counter(
+    'homework_bot_stage_total', 'Завершенные этапы обработки',
+    ('stage', 'outcome')
+))
+TENANT_POLLS = REGISTRY.register(Counter(
+    'homework_bot_tenant_polls_total', 'Опросы API по получателям',
+    ('tenant', 'outcome')
+))
+SCHEDULER_LAG = REGISTRY.register(Gauge(
+    'homework_bot_scheduler_lag_seconds',
+    'Отставание цикла опроса от расписания'
+))
+OUTBOX_STUCK = REGISTRY.register(Counter(
+    'homework_bot_outbox_stuck_total',
+    'Уведомления, не доставленные за max_attempts попыток'
+))
+CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    'homework_bot_circuit_open', 'Выключатель запросов к API разомкнут'
+))
+
+
+SPAN_HOOKS = []
+
+
+def add_span_hook(hook):
+    """Подключает `hook(stage, seconds, error)`, вызываемый после этапа.
+
+    `error` — исключение этапа или None. Без хуков `timed` их не вызывает.
+    """
+    SPAN_HOOKS.append(hook)
+
+
+def remove_span_hook(hook):
+    """Отключает хук, подключенный `add_span_hook`."""
+    if hook in SPAN_HOOKS:
+        SPAN_HOOKS.remove(hook)
+
+
+def run_span_hooks(stage, seconds, error):
+    """Вызывает хуки этапа; сбой хука не прерывает обработку."""
+    for hook in tuple(SPAN_HOOKS):
+        try:
+            hook(stage, seconds, error)
+        except Exception:
+            logging.exception(f'Сбой хука этапа {stage}')
+
+
+@contextmanager
+def timed(stage):
+    """Замеряет этап и учитывает его исход: ok или error."""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage)
+        STAGE_TOTAL.inc(stage, 'ok' if error is None else 'error')
+        if SPAN_HOOKS:
+            run_span_hooks(stage, seconds, error)
+
+
+def make_handler(registry):
+    """Обработчик GET /metrics; http.server импортируется только здесь."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдает метрики по GET /metrics."""
+
+        def do_GET(self):
+            """Обрабатывает запрос экспозиции."""
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Не засоряет лог запросами сборщика метрик."""
+
+    return MetricsHandler
+
+
+def serve(port, host='127.0.0.1'):
+    """Запускает HTTP-сервер метрик в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), make_handler(REGISTRY))
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    logging.info(f'Метрики доступны на http://{host}:{port}/metrics')
+    return server
@@ -0,0 +1,210 @@
+"""Очередь исходящих сообщений с ограничением частоты отправки."""
+import logging
+import os
+import queue
+import threading
+import time
+
+from exceptions import SendMessageError
+from metrics import timed
+from tenants import activate
+
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+TELEGRAM_GROUP_RATE = 20 / 60
+TELEGRAM_GROUP_BURST = 3
+
+
+def telegram_retry_after(result):
+    """Значение `retry_after` из тела ответа Telegram 429 или None."""
+    if not isinstance(result, dict):
+        return None
+    return (result.get('parameters') or {}).get('retry_after')
+
+
+def is_group_chat(chat_id):
+    """Групповой чат или канал: отрицательный id или @username."""
+    try:
+        return int(chat_id) < 0
+    except (TypeError, ValueError):
+        return str(chat_id).startswith('@')
+
+
+class TokenBucket:
+    """Корзина токенов: `rate` в секунду, запас до `capacity`."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity=1, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def reserve(self, now):
+        """Берет токен; возвращает, сколько секунд ждать до отправки."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Лимиты Telegram: общий на бота, на каждый чат и на каждую группу.
+
+    Группы дополнительно ограничены 20 сообщениями в минуту с запасом
+    `group_burst` сообщений подряд.
+    """
+
+    def __init__(self, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE, group_rate=TELEGRAM_GROUP_RATE,
+                 group_burst=TELEGRAM_GROUP_BURST, clock=time.monotonic):
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self.chat_buckets = {}
+        self.group_buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id):
+        """Резервирует отправку в чат; возвращает паузу в секундах."""
+        with self._lock:
+            now = self.clock()
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self.chat_buckets[chat_id] = TokenBucket(
+                    self.chat_rate, now=now
+                )
+            delays = [self.global_bucket.reserve(now), bucket.reserve(now)]
+            if is_group_chat(chat_id):
+                group = self.group_buckets.get(chat_id)
+                if group is None:
+                    group = self.group_buckets[chat_id] = TokenBucket(
+                        self.group_rate, self.group_burst, now
+                    )
+                delays.append(group.reserve(now))
+            return max(delays)
+
+
+class SendQueue:
+    """Отправляет сообщения пулом потоков с учетом лимитов Telegram.
+
+    Сообщения одного чата всегда попадают к одному потоку, поэтому
+    порядок уведомлений сохраняется. Очереди ограничены: при отставании
+    отправки `put` блокирует опрос.
+    """
+
+    def __init__(self, bot, send, limiter=None, workers=SEND_WORKERS,
+                 maxsize=1000, attempts=3, on_result=None):
+        self.bot = bot
+        self.send = send
+        self.on_result = on_result
+        self.limiter = limiter or RateLimiter()
+        self.attempts = attempts
+        self.stopped = threading.Event()
+        self.queues = [queue.Queue(maxsize) for _ in range(workers)]
+        self.threads = [
+            threading.Thread(
+                target=self._work, args=(jobs,), name=f'sender-{number}',
+                daemon=True
+            )
+            for number, jobs in enumerate(self.queues)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, tenant, message, key=None):
+        """Ставит сообщение получателю в очередь отправки.
+
+        Если задан `key`, после попытки отправки вызывается
+        `on_result(key, delivered)`.
+        """
+        worker = hash(str(tenant.chat_id)) % len(self.queues)
+        self.queues[worker].put((tenant, message, key))
+
+    def join(self):
+        """Ждет, пока все поставленные сообщения будут обработаны.
+
+        В главном потоке ожидание можно прервать исключением из
+        обработчика сигнала (см. `Lifecycle.sleeping`).
+        """
+        for jobs in self.queues:
+            jobs.join()
+
+    def close(self, timeout=None):
+        """Дожидается отправки и останавливает потоки.
+
+        Если за `timeout` секунд очередь не разобрана, оставшиеся сообщения
+        не отправляются: они остаются в outbox до следующего запуска.
+        Заполненная очередь тоже не задерживает остановку дольше срока.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            return max(deadline - time.monotonic(), 0)
+
+        for jobs in self.queues:
+            self._finish(jobs, remaining())
+        for thread in self.threads:
+            thread.join(remaining())
+        if any(thread.is_alive() for thread in self.threads):
+            self.stopped.set()
+        if self.stopped.is_set():
+            logging.warning(
+                'Очередь отправки не разобрана к сроку остановки'
+            )
+
+    def _finish(self, jobs, timeout):
+        if not self.stopped.is_set():
+            try:
+                jobs.put(None, timeout=timeout)
+                return
+            except queue.Full:
+                self.stopped.set()
+        try:
+            jobs.put_nowait(None)
+        except queue.Full:
+            # Поток выйдет на следующем сообщении, увидев `stopped`.
+            pass
+
+    def _work(self, jobs):
+        while True:
+            job = jobs.get()
+            try:
+                if job is None or self.stopped.is_set():
+                    return
+                tenant, message, key = job
+                delivered = self.deliver(tenant, message)
+                if key is not None and self.on_result is not None:
+                    self.on_result(key, delivered)
+            except Exception as error:
+                logging.error(f'Сбой в работе программы: {error}')
+            finally:
+                jobs.task_done()
+
+    def deliver(self, tenant, message):
+        """Отправляет сообщение, выжидая лимиты и `retry_after` из 429."""
+        for attempt in range(1, self.attempts + 1):
+            delay = self.limiter.reserve(tenant.chat_id)
+            if delay:
+                time.sleep(delay)
+            try:
+                with activate(tenant), timed('send'):
+                    self.send(self.bot, message)
+                return True
+            except SendMessageError as error:
+                if error.retry_after is None or attempt == self.attempts:
+                    return False
+                logging.warning(
+                    f'Telegram ограничил отправку, повтор через '
+                    f'{error.retry_after} с'
+                )
+                time.sleep(error.retry_after)
+        return False
@@ -0,0 +1,180 @@
+"""Постоянная очередь уведомлений с доставкой хотя бы один раз."""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+
+from changes import homework_key
+from metrics import OUTBOX_STUCK
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    tenant_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    sent REAL,
+    next_attempt REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent, created);
+'''
+
+
+def outbox_key(tenant, homework):
+    """Ключ идемпотентности: получатель, работа, статус и дата."""
+    return ':'.join((
+        tenant.tenant_id,
+        homework_key(homework),
+        str(homework.get('status')),
+        str(homework.get('date_updated')),
+    ))
+
+
+class Outbox:
+    """Уведомления записываются до отправки и подтверждаются после нее.
+
+    Неподтвержденная запись отправляется повторно с экспоненциальной
+    паузой от `retry_delay` до `max_retry_delay` секунд и не удаляется,
+    пока не будет доставлена. После `max_attempts` неудач запись
+    отмечается в логе и метрике, но попытки продолжаются; `requeue`
+    отправляет такие записи без ожидания. Отправленные записи хранятся
+    `keep_sent` секунд, чтобы повторно найденное изменение не ушло дважды.
+    Новая запись уже стоит в очереди отправки, поэтому `pending` выдает
+    ее не раньше чем через `lease` секунд: повтор из цикла не отправит ее
+    второй раз, пока идет первая отправка, а после сбоя процесса она
+    будет доставлена.
+    """
+
+    def __init__(self, path, max_attempts=10, keep_sent=86400,
+                 retry_delay=30, max_retry_delay=3600, lease=300,
+                 clock=time.time):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        columns = {
+            row[1] for row in self.connection.execute(
+                'PRAGMA table_info(outbox)'
+            )
+        }
+        if 'next_attempt' not in columns:
+            self.connection.execute(
+                'ALTER TABLE outbox ADD COLUMN '
+                'next_attempt REAL NOT NULL DEFAULT 0'
+            )
+        self.max_attempts = max_attempts
+        self.keep_sent = keep_sent
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease = lease
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def add(self, tenant, homework, message):
+        """Записывает уведомление; возвращает ключ или None для повтора."""
+        key = outbox_key(tenant, homework)
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO outbox (key, tenant_id, message, '
+                'created, next_attempt) VALUES (?, ?, ?, ?, ?)',
+                (
+                    key, tenant.tenant_id, message, self.clock(),
+                    self.clock() + self.lease
+                )
+            )
+        return key if cursor.rowcount else None
+
+    def settle(self, key, delivered):
+        """Подтверждает доставку или откладывает следующую попытку."""
+        with self._lock, self.connection:
+            if delivered:
+                self.connection.execute(
+                    'UPDATE outbox SET sent = ? WHERE key = ?',
+                    (self.clock(), key)
+                )
+                return
+            row = self.connection.execute(
+                'SELECT attempts FROM outbox WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            delay = min(
+                self.retry_delay * 2 ** min(attempts - 1, 32),
+                self.max_retry_delay
+            )
+            self.connection.execute(
+                'UPDATE outbox SET attempts = ?, next_attempt = ? '
+                'WHERE key = ?',
+                (attempts, self.clock() + delay, key)
+            )
+        if attempts == self.max_attempts:
+            OUTBOX_STUCK.inc()
+            logging.error(
+                f'Уведомление {key} не доставлено за {attempts} попыток, '
+                f'повтор каждые {self.max_retry_delay} с или по requeue'
+            )
+
+    def pending(self):
+        """Уведомления, которым пора отправиться: (ключ, получатель, текст)."""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT key, tenant_id, message FROM outbox '
+                'WHERE sent IS NULL AND next_attempt <= ? ORDER BY created',
+                (self.clock(),)
+            ).fetchall()
+
+    def requeue(self):
+        """Снимает паузы с неотправленных записей; возвращает их число."""
+        with self._lock, self.connection:
+            return self.connection.execute(
+                'UPDATE outbox SET attempts = 0, next_attempt = 0 '
+                'WHERE sent IS NULL'
+            ).rowcount
+
+    def forget(self, tenant):
+        """Удаляет неотправленные уведомления получателя.
+
+        Отправленные записи остаются до `prune`, чтобы вернувшийся в
+        список получатель не получил их повторно.
+        """
+        with self._lock, self.connection:
+            deleted = self.connection.execute(
+                'DELETE FROM outbox WHERE tenant_id = ? AND sent IS NULL',
+                (tenant.tenant_id,)
+            ).rowcount
+        if deleted:
+            logging.info(
+                f'Из outbox удалено {deleted} уведомлений получателя '
+                f'{tenant.tenant_id}'
+            )
+
+    def prune(self):
+        """Удаляет давно отправленные записи."""
+        with self._lock, self.connection:
+            deleted = self.connection.execute(
+                'DELETE FROM outbox WHERE sent < ?',
+                (self.clock() - self.keep_sent,)
+            ).rowcount
+        if deleted:
+            logging.debug(f'Из outbox удалено {deleted} записей')
+
+    def close(self):
+        """Закрывает базу."""
+        self.connection.close()
+
+
+def main(argv=None):
+    """Командная строка: `python outbox.py requeue bot_state.sqlite3`."""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2 or args[0] != 'requeue':
+        sys.exit('Использование: python outbox.py requeue <STATE_DB>')
+    outbox = Outbox(args[1])
+    try:
+        print(f'Снова в очереди: {outbox.requeue()}')
+    finally:
+        outbox.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Профилирование живого процесса по сигналам: cProfile и tracemalloc."""
+import logging
+import os
+import signal
+import threading
+import time
+
+PROFILE_SIGNAL = getattr(signal, 'SIGUSR1', None)
+SNAPSHOT_SIGNAL = getattr(signal, 'SIGUSR2', None)
+TRACEMALLOC_FRAMES = 25
+
+
+class SignalProfiler:
+    """Включает и выключает профилирование без перезапуска бота.
+
+    Первый `PROFILE_SIGNAL` запускает cProfile, второй останавливает его и
+    пишет статистику в `directory` (читается `pstats` или snakeviz).
+    cProfile видит только главный поток, где идет цикл опроса. Первый
+    `SNAPSHOT_SIGNAL` включает tracemalloc, второй пишет снимок памяти и
+    выключает трассировку: в снимке остаются выделения, пережившие окно
+    между сигналами. Сами модули профилирования импортируются только по
+    сигналу, чтобы не замедлять запуск.
+    """
+
+    def __init__(self, directory, profile_signal=PROFILE_SIGNAL,
+                 snapshot_signal=SNAPSHOT_SIGNAL):
+        self.directory = directory
+        self.profile_signal = profile_signal
+        self.snapshot_signal = snapshot_signal
+        self.profile = None
+        self.tracing = False
+        self._previous = {}
+
+    def install(self):
+        """Ставит обработчики сигналов (только в главном потоке)."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        handlers = {
+            self.profile_signal: self.toggle_profile,
+            self.snapshot_signal: self.toggle_tracemalloc,
+        }
+        for signum, handler in handlers.items():
+            if signum is not None:
+                self._previous[signum] = signal.signal(
+                    signum, lambda signum, frame, handler=handler: handler()
+                )
+
+    def uninstall(self):
+        """Возвращает прежние обработчики и дописывает начатые замеры."""
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+        self.close()
+
+    def close(self):
+        """Останавливает профилирование, сохранив результаты."""
+        if self.profile is not None:
+            self.toggle_profile()
+        if self.tracing:
+            self.toggle_tracemalloc()
+
+    def toggle_profile(self):
+        """Запускает cProfile или останавливает его с записью статистики."""
+        if self.profile is None:
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            logging.warning('Профилирование cProfile включено')
+            return None
+        self.profile.disable()
+        path = self._path('profile', 'prof')
+        self.profile.dump_stats(path)
+        self.profile = None
+        logging.warning(f'Профиль cProfile записан в {path}')
+        return path
+
+    def toggle_tracemalloc(self):
+        """Включает tracemalloc или пишет снимок памяти и выключает его."""
+        import tracemalloc
+
+        if not self.tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.tracing = True
+            logging.warning('Трассировка памяти tracemalloc включена')
+            return None
+        path = self._path('memory', 'tracemalloc')
+        tracemalloc.take_snapshot().dump(path)
+        tracemalloc.stop()
+        self.tracing = False
+        logging.warning(f'Снимок памяти записан в {path}')
+        return path
+
+    def _path(self, kind, extension):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return os.path.join(
+            self.directory, f'{kind}-{os.getpid()}-{stamp}.{extension}'
+        )
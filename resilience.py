@@ -0,0 +1,226 @@
+"""Повторы запросов к API с задержкой и автоматический выключатель."""
+import logging
+import random
+import threading
+import time
+from http import HTTPStatus
+
+from exceptions import ApiCodeError, CircuitOpenError
+from metrics import CIRCUIT_OPEN
+
+STOP_CHECK_INTERVAL = 0.2
+
+
+def parse_retry_after(value, now=None):
+    """Секунды ожидания из заголовка `Retry-After` или None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(moment.timestamp() - now, 0)
+
+
+def is_transient(error):
+    """Ошибка сети, 429 или 5xx: повтор имеет смысл."""
+    if not isinstance(error, ApiCodeError):
+        return False
+    code = error.status_code
+    return (
+        code is None
+        or code == HTTPStatus.TOO_MANY_REQUESTS
+        or code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    )
+
+
+def is_outage(error):
+    """Ошибка сети или 5xx: признак недоступности API для выключателя.
+
+    Ответ 429 относится к одному токену, поэтому выключатель, общий для
+    всех получателей, его не учитывает.
+    """
+    return is_transient(error) and (
+        error.status_code != HTTPStatus.TOO_MANY_REQUESTS
+    )
+
+
+class RetryPolicy:
+    """Экспоненциальная задержка с джиттером для временных ошибок.
+
+    Ошибки авторизации и прочие 4xx не повторяются; `Retry-After`
+    от сервера важнее собственной задержки, но не дольше `max_delay`.
+    """
+
+    def __init__(self, attempts=3, base_delay=1, max_delay=30):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, error, attempt):
+        """Пауза перед повтором номер `attempt` или None — не повторять."""
+        if attempt >= self.attempts or not is_transient(error):
+            return None
+        if error.retry_after is not None:
+            if error.retry_after > self.max_delay:
+                return None
+            return error.retry_after
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt)
+        )
+
+
+class CircuitBreaker:
+    """Прекращает запросы к API после серии временных сбоев.
+
+    После `failure_threshold` сбоев подряд выключатель размыкается на
+    `reset_timeout` секунд, затем пропускает один пробный запрос. Ответы
+    429 сбоями не считаются: их ожидание задает `Retry-After`. Опросы
+    из пула потоков делят один выключатель, поэтому переходы состояний
+    защищены блокировкой.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Проверяет, можно ли сейчас обращаться к API."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = (
+                    self.opened_at + self.reset_timeout - self.clock()
+                )
+                if remaining > 0:
+                    raise CircuitOpenError(retry_after=remaining)
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial:
+                    raise CircuitOpenError()
+                self._trial = True
+
+    def record_success(self):
+        """Успешный ответ замыкает выключатель."""
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        """Учитывает временный сбой."""
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if (
+                self.state == self.HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                self.opened_at = self.clock()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """Пробный запрос завершился без вывода о доступности API."""
+        with self._lock:
+            self._trial = False
+
+    def _set_state(self, state):
+        if state == self.OPEN:
+            logging.warning(
+                f'Выключатель разомкнут после {self.failures} сбоев, '
+                f'пауза {self.reset_timeout} с'
+            )
+        else:
+            logging.info(f'Выключатель: {self.state} -> {state}')
+        self.state = state
+        CIRCUIT_OPEN.set(int(state == self.OPEN))
+
+
+class ResilientCaller:
+    """Вызывает функцию запроса с повторами и через выключатель.
+
+    Если задан `stopping`, пауза перед повтором прерывается, как только
+    он вернет True, и вызов завершается последней ошибкой.
+    """
+
+    def __init__(self, policy=None, breaker=None, stopping=None):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.stopping = stopping
+
+    def _wait(self, delay):
+        """Пауза перед повтором; False, если ее прервала остановка."""
+        if self.stopping is None:
+            time.sleep(delay)
+            return True
+        deadline = time.monotonic() + delay
+        while not self.stopping():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, STOP_CHECK_INTERVAL))
+        return False
+
+    def _outcome(self, error, attempt):
+        """Учитывает ошибку; возвращает паузу или None."""
+        if is_outage(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        delay = self.policy.delay(error, attempt)
+        if delay is not None:
+            logging.warning(f'Повтор запроса через {delay:.1f} с: {error}')
+        return delay
+
+    def call(self, func, *args):
+        """Синхронный вызов с повторами."""
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = func(*args)
+            except Exception as error:
+                delay = self._outcome(error, attempt)
+                if delay is None or not self._wait(delay):
+                    raise
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def call_async(self, func, *args):
+        """Асинхронный вызов с повторами."""
+        import asyncio
+
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await func(*args)
+            except Exception as error:
+                delay = self._outcome(error, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
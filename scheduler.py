@@ -0,0 +1,140 @@
+"""Планировщик опроса с интервалом, зависящим от активности студента."""
+import logging
+import random
+
+from timing_wheel import TimingWheel
+
+HOUR = 3600
+
+
+class Slot:
+    """Расписание одного получателя."""
+
+    __slots__ = ('idle', 'interval')
+
+    def __init__(self):
+        self.idle = 0
+        self.interval = None
+
+
+class AdaptiveScheduler:
+    """Назначает каждому получателю время следующего опроса.
+
+    Пока работа на ревью, интервал сокращается до `min_interval`; после
+    `idle_polls` опросов без изменений он удваивается до `max_interval`.
+    Если суммарная частота запросов превышает `hourly_budget`, все
+    интервалы пропорционально растягиваются.
+
+    Время планировщика логическое: оно сдвигается ровно на ту паузу,
+    которую вернул `advance`, поэтому расписание не зависит от длительности
+    самих запросов. Сроки опросов хранятся в колесе таймеров, поэтому ни
+    перепланирование, ни выбор получателей цикла не зависят от их общего
+    числа. Новые получатели попадают в расписание через `add`, и их первые
+    опросы случайно разносятся так, чтобы в секунду их было не больше
+    `start_rate`.
+    """
+
+    def __init__(self, base_interval, min_interval, max_interval,
+                 idle_polls=6, hourly_budget=None, start_rate=20,
+                 rng=random):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_polls = idle_polls
+        self.hourly_budget = hourly_budget
+        self.start_rate = start_rate
+        self.rng = rng
+        self.now = 0
+        self.wheel = TimingWheel()
+        self._rate = 0
+        self._slots = {}
+        self._ready = {}
+
+    def add(self, tenants):
+        """Ставит в расписание получателей, которых в нем еще нет."""
+        new = [
+            tenant for tenant in tenants
+            if tenant.tenant_id not in self._slots
+        ]
+        spread = len(new) / self.start_rate if self.start_rate else 0
+        for tenant in new:
+            self._slot(tenant)
+            offset = int(self.rng.uniform(0, spread))
+            if offset:
+                self.wheel.add(tenant.tenant_id, self.now + offset)
+            else:
+                self._ready[tenant.tenant_id] = None
+
+    def due(self, registry):
+        """Получатели, которых пора опросить, в порядке готовности.
+
+        Реестр не обходится: получатели берутся из сработавших таймеров.
+        Тех, кого в реестре уже нет, планировщик забывает.
+        """
+        self._ready.update(dict.fromkeys(self.wheel.advance(self.now)))
+        due = []
+        for tenant_id in list(self._ready):
+            tenant = registry.get(tenant_id)
+            if tenant is None:
+                self._drop(tenant_id)
+            else:
+                due.append(tenant)
+        return due
+
+    def interval(self, tenant, changed):
+        """Интервал до следующего опроса без учета бюджета."""
+        slot = self._slot(tenant)
+        idle = slot.idle = 0 if changed else slot.idle + 1
+        if tenant.index.count('reviewing'):
+            return self.min_interval
+        stretch = min(max(idle - self.idle_polls, 0), 16)
+        return max(
+            self.min_interval,
+            min(self.base_interval * 2 ** stretch, self.max_interval)
+        )
+
+    def schedule(self, tenant, changed):
+        """Планирует следующий опрос получателя после текущего."""
+        interval = self.interval(tenant, changed)
+        slot = self._slot(tenant)
+        if slot.interval:
+            self._rate -= HOUR / slot.interval
+        self._rate += HOUR / interval
+        slot.interval = interval
+        if self.hourly_budget and self._rate > self.hourly_budget:
+            interval = round(interval * self._rate / self.hourly_budget)
+        self._ready.pop(tenant.tenant_id, None)
+        self.wheel.add(tenant.tenant_id, self.now + interval)
+
+    def forget(self, tenant):
+        """Убирает получателя из расписания."""
+        self._drop(tenant.tenant_id)
+
+    def _drop(self, tenant_id):
+        slot = self._slots.pop(tenant_id, None)
+        self._ready.pop(tenant_id, None)
+        self.wheel.cancel(tenant_id)
+        if slot is not None and slot.interval:
+            self._rate -= HOUR / slot.interval
+
+    def rewind(self, seconds):
+        """Возвращает время назад, если ожидание прервали раньше срока."""
+        self.now = max(self.now - int(max(seconds, 0)), self.wheel.now)
+
+    def _slot(self, tenant):
+        slot = self._slots.get(tenant.tenant_id)
+        if slot is None:
+            slot = self._slots[tenant.tenant_id] = Slot()
+        return slot
+
+    def advance(self):
+        """Возвращает паузу до ближайшего опроса и сдвигает время."""
+        next_poll = self.wheel.next_time()
+        if self._ready:
+            next_poll = self.now
+        elif next_poll is None:
+            next_poll = self.now + self.base_interval
+        delay = max(next_poll - self.now, 0)
+        self.now += delay
+        logging.debug(f'Следующий опрос через {delay} с')
+        return delay
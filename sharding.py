@@ -0,0 +1,218 @@
+"""Распределение получателей между воркерами: хеш-кольцо и аренды."""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect
+
+from tenants import TenantRegistry
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    tenant_id TEXT PRIMARY KEY,
+    worker TEXT NOT NULL
+);
+'''
+
+
+def ring_hash(key):
+    """Позиция ключа на кольце."""
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Консистентное хеширование: у каждого узла `replicas` точек.
+
+    При выходе узла из кольца к другим переходят только его получатели.
+    """
+
+    def __init__(self, nodes, replicas=64):
+        self.nodes = sorted(nodes)
+        points = sorted(
+            (ring_hash(f'{node}#{replica}'), node)
+            for node in self.nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        """Узел, которому принадлежит ключ; None для пустого кольца."""
+        if not self._nodes:
+            return None
+        return self._nodes[bisect(self._hashes, ring_hash(key)) % len(
+            self._nodes
+        )]
+
+
+class Shard:
+    """Доля получателей одного воркера в общей базе `STATE_DB`.
+
+    Воркер раз в `ttl / 3` секунд отмечается в таблице `workers` из
+    фонового потока. Живые воркеры образуют кольцо, а право опрашивать
+    получателя подтверждается арендой в таблице `leases`: забрать аренду
+    можно, только если ее владелец перестал отмечаться дольше `ttl`
+    секунд или уже отпустил ее. Поэтому каждого получателя опрашивает
+    ровно один воркер, а получатели упавшего воркера расходятся по живым.
+    Когда состав воркеров меняется или воркер ждет освобождения аренд,
+    вызывается `on_change`, чтобы цикл опроса не ждал следующего срока.
+    Доля пересчитывается только при изменении кольца или реестра, пока
+    воркер ждет аренд, и раз в `ttl` секунд для сверки аренд с базой;
+    в остальных циклах `claim` не обходит получателей.
+    """
+
+    def __init__(self, path, name, ttl=30, on_change=None, clock=time.time):
+        self.connection = sqlite3.connect(
+            path, timeout=ttl, check_same_thread=False
+        )
+        self.connection.executescript(SCHEMA)
+        self.name = name
+        self.ttl = ttl
+        self.on_change = on_change
+        self.clock = clock
+        self.owned = set()
+        self.waiting = set()
+        self._members = None
+        self._claimed = None
+        self._source = None
+        self._version = None
+        self._expires = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Отмечается и запускает фоновый поток отметок."""
+        self.beat()
+        self._thread = threading.Thread(
+            target=self._run, name='shard', daemon=True
+        )
+        self._thread.start()
+
+    def beat(self):
+        """Отметка воркера; True, если пора снова вызвать claim.
+
+        Это нужно, когда состав воркеров изменился или часть получателей
+        воркера еще арендована другими.
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO workers (name, seen) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET seen = excluded.seen',
+                (self.name, self.clock())
+            )
+        if self._members is None:
+            return False
+        return bool(self.waiting) or self.members() != self._members
+
+    def members(self):
+        """Имена живых воркеров."""
+        with self._lock:
+            return [name for name, in self.connection.execute(
+                'SELECT name FROM workers WHERE seen >= ? ORDER BY name',
+                (self.clock() - self.ttl,)
+            )]
+
+    def claim(self, registry, store, scheduler):
+        """Реестр получателей, которыми воркер владеет в этом цикле.
+
+        Перед тем как отпустить получателей, состояние записывается в
+        базу; у полученных получателей оно перечитывается оттуда же.
+        """
+        members = self.members()
+        if self._fresh(registry, members):
+            return self._claimed
+        self._members = members
+        ring = HashRing(members)
+        # Получатели с общим токеном попадают к одному воркеру, чтобы
+        # он опрашивал токен одним запросом.
+        wanted = {
+            tenant.tenant_id for tenant in registry
+            if ring.owner(tenant.practicum_token) == self.name
+        }
+        lost = self.owned - wanted
+        if lost:
+            store.flush()
+            for tenant_id in lost:
+                tenant = registry.get(tenant_id)
+                if tenant is not None:
+                    scheduler.forget(tenant)
+        owned = self._lease(wanted)
+        gained = [registry.get(tenant_id) for tenant_id in owned - self.owned]
+        for tenant in gained:
+            store.load(tenant)
+        scheduler.add(gained)
+        if owned != self.owned:
+            logging.info(
+                f'Воркер {self.name}: {len(owned)} получателей, '
+                f'воркеров в кольце {len(self._members)}'
+            )
+        self.owned = owned
+        self.waiting = wanted - owned
+        self._source, self._version = registry, registry.version
+        self._expires = self.clock() + self.ttl
+        self._claimed = TenantRegistry(
+            registry.get(tenant_id) for tenant_id in owned
+        )
+        return self._claimed
+
+    def close(self):
+        """Отпускает аренды и останавливает отметки."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM leases WHERE worker = ?', (self.name,)
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE name = ?', (self.name,)
+            )
+        self.connection.close()
+
+    def _fresh(self, registry, members):
+        return (
+            self._claimed is not None and not self.waiting
+            and members == self._members and registry is self._source
+            and registry.version == self._version
+            and self.clock() < self._expires
+        )
+
+    def _lease(self, wanted):
+        with self._lock, self.connection:
+            held = {tenant_id for tenant_id, in self.connection.execute(
+                'SELECT tenant_id FROM leases WHERE worker = ?',
+                (self.name,)
+            )}
+            self.connection.executemany(
+                'DELETE FROM leases WHERE tenant_id = ? AND worker = ?',
+                ((tenant_id, self.name) for tenant_id in held - wanted)
+            )
+            self.connection.executemany(
+                'INSERT INTO leases (tenant_id, worker) VALUES (?, ?) '
+                'ON CONFLICT (tenant_id) DO UPDATE SET worker = '
+                'excluded.worker WHERE leases.worker NOT IN '
+                '(SELECT name FROM workers WHERE seen >= ?)',
+                (
+                    (tenant_id, self.name, self.clock() - self.ttl)
+                    for tenant_id in wanted
+                )
+            )
+            return {tenant_id for tenant_id, in self.connection.execute(
+                'SELECT tenant_id FROM leases WHERE worker = ?',
+                (self.name,)
+            )} & wanted
+
+    def _run(self):
+        while not self._stopped.wait(self.ttl / 3):
+            try:
+                if self.beat() and self.on_change is not None:
+                    self.on_change()
+            except sqlite3.Error as error:
+                logging.error(f'Сбой отметки воркера {self.name}: {error}')
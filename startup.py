@@ -0,0 +1,47 @@
+"""Замеры холодного старта: импорт модулей и шаги инициализации."""
+import sys
+import time
+
+
+class StartupProfile:
+    """Последовательность шагов запуска и их длительность.
+
+    Каждая отметка `mark` закрывает шаг, начатый предыдущей отметкой.
+    После `finish` отметки не копятся, а отчет печатается, только если
+    профиль включен.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = self.last = clock()
+        self.steps = []
+        self.enabled = False
+        self.finished = False
+
+    def mark(self, name):
+        """Завершает шаг `name`."""
+        if self.finished:
+            return
+        now = self.clock()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def finish(self, name, stream=None):
+        """Завершает последний шаг и печатает отчет, если профиль включен."""
+        if self.finished:
+            return
+        self.mark(name)
+        self.finished = True
+        if self.enabled:
+            self.report(stream or sys.stderr)
+
+    def report(self, stream):
+        """Печатает таблицу шагов и общее время."""
+        width = max((len(name) for name, _ in self.steps), default=0)
+        for name, seconds in self.steps:
+            print(f'{name:<{width}} {seconds * 1000:8.1f} мс', file=stream)
+        total = (self.last - self.started) * 1000
+        print(f'{"итого":<{width}} {total:8.1f} мс', file=stream)
+
+
+PROFILE = StartupProfile()
@@ -0,0 +1,203 @@
+"""Постоянное хранилище состояния опроса: курсор и статусы работ."""
+import logging
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursors (
+    tenant_id TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant_id TEXT NOT NULL,
+    homework_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date_updated TEXT,
+    PRIMARY KEY (tenant_id, homework_id)
+);
+CREATE TABLE IF NOT EXISTS history (
+    tenant_id TEXT NOT NULL,
+    homework_id TEXT NOT NULL,
+    homework_name TEXT,
+    status TEXT NOT NULL,
+    date_updated TEXT,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (tenant_id, homework_id, status, date_updated)
+);
+CREATE INDEX IF NOT EXISTS history_recent ON history (tenant_id, recorded);
+'''
+
+
+class StateStore:
+    """Состояние получателей в SQLite с отложенной пакетной записью.
+
+    Изменения копятся в памяти и записываются одной транзакцией, когда
+    набирается `batch_size` записей или проходит `flush_interval` секунд.
+    Чтение для команд бота идет из другого потока, поэтому доступ к базе
+    и буферам защищен блокировкой. Текущие статусы получателя читаются из
+    базы при первой команде и дальше поддерживаются в памяти.
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=5):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._cursors = {}
+        self._statuses = {}
+        self._history = []
+        self._current = {}
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+
+    def load(self, tenant):
+        """Восстанавливает курсор и статусы получателя."""
+        row = self.connection.execute(
+            'SELECT timestamp FROM cursors WHERE tenant_id = ?',
+            (tenant.tenant_id,)
+        ).fetchone()
+        if row is not None:
+            # Курсор — время сервера на последнем опросе: данные не старше.
+            tenant.timestamp = tenant.checked = row[0]
+        for homework_id, status, date_updated in self.connection.execute(
+            'SELECT homework_id, status, date_updated FROM statuses '
+            'WHERE tenant_id = ?',
+            (tenant.tenant_id,)
+        ):
+            tenant.index.restore(homework_id, status, date_updated)
+
+    def load_all(self, registry):
+        """Восстанавливает состояние всех получателей реестра."""
+        for tenant in registry:
+            self.load(tenant)
+        logging.info(f'Состояние загружено для {len(registry)} получателей')
+
+    def record_cursor(self, tenant, timestamp):
+        """Сдвигает курсор и отмечает время успешного опроса получателя."""
+        tenant.timestamp = timestamp
+        tenant.checked = time.time()
+        with self._lock:
+            self._cursors[tenant.tenant_id] = timestamp
+
+    def record_status(self, tenant, homework):
+        """Запоминает статус работы, о котором сообщили получателю."""
+        key = tenant.index.update(homework)
+        status, date_updated = homework['status'], homework.get('date_updated')
+        with self._lock:
+            self._statuses[tenant.tenant_id, key] = (status, date_updated)
+            self._history.append((
+                tenant.tenant_id, key, homework.get('homework_name'),
+                status, date_updated, time.time()
+            ))
+            current = self._current.get(tenant.tenant_id)
+            if current is not None:
+                current[key] = (
+                    homework.get('homework_name') or key, status,
+                    date_updated
+                )
+
+    def statuses(self, tenant):
+        """Текущие статусы работ: (название, статус, дата), новые первыми."""
+        with self._lock:
+            current = self._current.get(tenant.tenant_id)
+            if current is None:
+                current = self._current[tenant.tenant_id] = self._read(
+                    tenant
+                )
+            rows = list(current.values())
+        return sorted(rows, key=lambda row: row[2] or '', reverse=True)
+
+    def _read(self, tenant):
+        rows = {
+            homework_id: (name or homework_id, status, date_updated)
+            for homework_id, name, status, date_updated
+            in self.connection.execute(
+                'SELECT s.homework_id, (SELECT homework_name '
+                'FROM history AS h WHERE h.tenant_id = s.tenant_id '
+                'AND h.homework_id = s.homework_id '
+                'ORDER BY recorded DESC LIMIT 1), s.status, '
+                's.date_updated FROM statuses AS s WHERE s.tenant_id = ?',
+                (tenant.tenant_id,)
+            )
+        }
+        for tenant_id, homework_id, name, status, date_updated, _ in (
+            self._history
+        ):
+            if tenant_id == tenant.tenant_id:
+                rows[homework_id] = (name or homework_id, status, date_updated)
+        return rows
+
+    def history(self, tenant, limit=10):
+        """Последние смены статусов: (название, статус, дата)."""
+        with self._lock:
+            recent = [
+                (name or homework_id, status, date_updated)
+                for tenant_id, homework_id, name, status, date_updated, _
+                in reversed(self._history)
+                if tenant_id == tenant.tenant_id
+            ][:limit]
+            recent.extend(self.connection.execute(
+                'SELECT COALESCE(homework_name, homework_id), status, '
+                'date_updated FROM history WHERE tenant_id = ? '
+                'ORDER BY recorded DESC LIMIT ?',
+                (tenant.tenant_id, limit - len(recent))
+            ))
+        return recent
+
+    def forget(self, tenant):
+        """Удаляет состояние получателя из буферов и базы."""
+        tenant_id = tenant.tenant_id
+        with self._lock, self.connection:
+            self._cursors.pop(tenant_id, None)
+            for key in [key for key in self._statuses if key[0] == tenant_id]:
+                del self._statuses[key]
+            self._history = [
+                row for row in self._history if row[0] != tenant_id
+            ]
+            self._current.pop(tenant_id, None)
+            for table in ('cursors', 'statuses', 'history'):
+                self.connection.execute(
+                    f'DELETE FROM {table} WHERE tenant_id = ?', (tenant_id,)
+                )
+
+    @property
+    def pending(self):
+        """Количество изменений, еще не записанных на диск."""
+        return len(self._cursors) + len(self._statuses)
+
+    def maybe_flush(self):
+        """Записывает изменения, если накопился пакет или вышло время."""
+        elapsed = time.monotonic() - self._last_flush
+        if self.pending >= self.batch_size or elapsed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self.pending:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                    self._cursors.items()
+                )
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                    (key + value for key, value in self._statuses.items())
+                )
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO history VALUES (?, ?, ?, ?, ?, ?)',
+                    self._history
+                )
+            logging.debug(f'Состояние сохранено: {self.pending} изменений')
+            self._cursors.clear()
+            self._statuses.clear()
+            self._history.clear()
+
+    def close(self):
+        """Сохраняет оставшиеся изменения и закрывает базу."""
+        with self._lock:
+            self.flush()
+            self.connection.close()
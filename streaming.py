@@ -0,0 +1,125 @@
+"""Потоковый разбор ответа API: работы читаются из тела по одной."""
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+DECODER = json.JSONDecoder()
+
+
+class StreamedAnswer:
+    """Ответ API, список `homeworks` которого разбирается по мере чтения.
+
+    В памяти держится только текущий фрагмент тела и одна работа.
+    Остальные поля верхнего уровня (например, `current_date`) доступны в
+    `fields` после того, как `homeworks()` прочитан до конца.
+    """
+
+    def __init__(self, chunks, close=None, key='homeworks'):
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._exhausted = False
+        self.key = key
+        self.fields = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Закрывает соединение, из которого читается тело."""
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def homeworks(self):
+        """Генератор работ из ответа; проверяет структуру ответа."""
+        if self._next_char() != '{':
+            raise TypeError('Ответ API должен быть словарем')
+        found = False
+        first = True
+        self._position += 1
+        while self._next_char() != '}':
+            if not first:
+                self._expect(',')
+            first = False
+            name = self._value()
+            self._expect(':')
+            if name == self.key:
+                found = True
+                yield from self._items()
+            else:
+                self.fields[name] = self._value()
+        if not found:
+            raise KeyError(f"Ответ не содержит '{self.key}'")
+
+    def _items(self):
+        if self._next_char() != '[':
+            raise TypeError(f"'{self.key}' в ответе должен быть списком")
+        self._position += 1
+        first = True
+        while self._next_char() != ']':
+            if not first:
+                self._expect(',')
+            first = False
+            yield self._value()
+        self._position += 1
+
+    def _expect(self, char):
+        if self._next_char() != char:
+            raise json.JSONDecodeError(
+                f'Ожидался символ {char!r}', self._buffer, self._position
+            )
+        self._position += 1
+
+    def _next_char(self):
+        """Первый значимый символ; дочитывает тело при необходимости."""
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise json.JSONDecodeError(
+                    'Ответ API оборвался', self._buffer, self._position
+                )
+
+    def _value(self):
+        """Очередное значение JSON целиком.
+
+        Значение принимается, только если за ним в буфере уже есть символ:
+        иначе число на границе фрагментов было бы прочитано не полностью.
+        """
+        self._next_char()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self._buffer, self._position)
+                if end < len(self._buffer) or self._exhausted:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._exhausted:
+                    raise
+            self._read()
+
+    def _read(self):
+        """Добавляет в буфер следующий фрагмент; False в конце тела."""
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._exhausted = True
+        self._buffer += self._decoder.decode(b'', final=True)
+        return False
@@ -0,0 +1,125 @@
+"""Супервизор: запускает воркеры бота и делит между ними получателей.
+
+Запуск::
+
+    WORKERS=4 python supervisor.py
+
+Каждый воркер — отдельный процесс с обычным циклом `homework.main`,
+который опрашивает только арендованных им получателей (см. `sharding`).
+При `WORKERS=1` бот работает в одном процессе, как `python homework.py`.
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import homework
+from exceptions import ShutdownRequested
+from lifecycle import Lifecycle
+
+WORKERS = int(os.getenv('WORKERS', 1))
+RESTART_DELAY = int(os.getenv('RESTART_DELAY', 60))
+MAX_RESTART_DELAY = 900
+CHECK_INTERVAL = 1
+
+
+def run_worker(name, metrics_port):
+    """Точка входа процесса-воркера."""
+    homework.SHARD_WORKER = name
+    homework.METRICS_PORT = metrics_port
+    # Обновления Telegram может забирать только один процесс.
+    homework.BOT_COMMANDS = False
+    homework.main()
+
+
+class Supervisor:
+    """Держит `workers` процессов и перезапускает упавшие.
+
+    Упавший воркер перезапускается не сразу, а через `restart_delay`
+    секунд, с удвоением при повторных падениях: за это время его аренды
+    истекают и получатели переходят к живым воркерам.
+    """
+
+    def __init__(self, workers, restart_delay=RESTART_DELAY,
+                 clock=time.monotonic):
+        self.names = [f'worker-{number}' for number in range(workers)]
+        self.restart_delay = restart_delay
+        self.clock = clock
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = {}
+        self._delays = {}
+        self._restart_at = {}
+
+    def start(self, name):
+        """Запускает воркер с именем `name`."""
+        port = homework.METRICS_PORT
+        if port:
+            port += self.names.index(name)
+        process = self.context.Process(
+            target=run_worker, args=(name, port), name=name
+        )
+        process.start()
+        self.processes[name] = process
+        logging.info(f'Запущен {name}, pid {process.pid}')
+
+    def check(self):
+        """Замечает упавшие воркеры и перезапускает их по расписанию."""
+        now = self.clock()
+        for name in self.names:
+            process = self.processes.get(name)
+            if process is not None and process.is_alive():
+                continue
+            if name not in self._restart_at:
+                delay = self._delays.get(name, self.restart_delay / 2) * 2
+                self._delays[name] = min(delay, MAX_RESTART_DELAY)
+                self._restart_at[name] = now + self._delays[name]
+                logging.error(
+                    f'{name} завершился с кодом {process.exitcode}, '
+                    f'перезапуск через {self._delays[name]:.0f} с'
+                )
+            elif now >= self._restart_at[name]:
+                del self._restart_at[name]
+                self.start(name)
+
+    def stop(self, timeout):
+        """Передает воркерам SIGTERM и ждет их мягкой остановки."""
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = self.clock() + timeout
+        for process in self.processes.values():
+            process.join(max(deadline - self.clock(), 0))
+            if process.is_alive():
+                logging.error(f'{process.name} не остановился, завершаем')
+                process.kill()
+                process.join()
+
+
+def main():
+    """Запуск супервизора или одного процесса при `WORKERS=1`."""
+    if WORKERS <= 1:
+        homework.main()
+        return
+    homework.setup_logging()
+    if homework.STATE_DB == ':memory:':
+        sys.exit('Ошибка: воркерам нужна общая база STATE_DB в файле')
+    supervisor = Supervisor(WORKERS)
+    lifecycle = Lifecycle()
+    lifecycle.install()
+    for name in supervisor.names:
+        supervisor.start(name)
+    try:
+        while True:
+            supervisor.check()
+            with lifecycle.sleeping():
+                time.sleep(CHECK_INTERVAL)
+    except ShutdownRequested:
+        logging.info('Останавливаем воркеры')
+    finally:
+        lifecycle.uninstall()
+        supervisor.stop(homework.SHUTDOWN_TIMEOUT + 5)
+
+
+if __name__ == '__main__':
+    main()
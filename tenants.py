@@ -0,0 +1,262 @@
+"""Реестр получателей уведомлений: пары токен Практикума / чат Telegram."""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from changes import ChangeIndex
+from exceptions import TenantConfigError
+
+current_tenant = ContextVar('current_tenant', default=None)
+
+
+class Tenant:
+    """Студент: токен API Практикума и чат для уведомлений."""
+
+    __slots__ = (
+        'practicum_token', 'chat_id', 'tenant_id', 'timestamp', 'checked',
+        'index', '__weakref__'
+    )
+
+    def __init__(self, practicum_token, chat_id, tenant_id=None):
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.tenant_id = str(tenant_id or chat_id)
+        self.timestamp = 0
+        self.checked = None
+        self.index = ChangeIndex()
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API от имени студента."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+    def __repr__(self):
+        return f'Tenant({self.tenant_id!r})'
+
+
+class TenantRegistry:
+    """Набор получателей, которых опрашивает один процесс.
+
+    `version` растет при каждом изменении состава, токенов или чатов,
+    чтобы производные от реестра данные пересчитывались только тогда.
+    """
+
+    def __init__(self, tenants=()):
+        self._tenants = {}
+        self._by_chat = {}
+        self._by_token = {}
+        self.version = 0
+        for tenant in tenants:
+            self.add(tenant)
+
+    def add(self, tenant):
+        """Добавляет получателя; идентификаторы не должны повторяться."""
+        if tenant.tenant_id in self._tenants:
+            raise TenantConfigError(
+                f'Повторяющийся получатель: {tenant.tenant_id}'
+            )
+        self._tenants[tenant.tenant_id] = tenant
+        self._by_chat.setdefault(str(tenant.chat_id), tenant)
+        self._by_token.setdefault(tenant.practicum_token, []).append(tenant)
+        self.version += 1
+
+    def remove(self, tenant_id):
+        """Убирает получателя; возвращает его или None."""
+        tenant = self._tenants.pop(str(tenant_id), None)
+        if tenant is None:
+            return None
+        if self._by_chat.get(str(tenant.chat_id)) is tenant:
+            del self._by_chat[str(tenant.chat_id)]
+        self._unlink_token(tenant)
+        self.version += 1
+        return tenant
+
+    def update(self, fresh):
+        """Переносит токен и чат в существующего получателя.
+
+        Курсор и известные статусы остаются прежними.
+        """
+        tenant = self._tenants[fresh.tenant_id]
+        if self._by_chat.get(str(tenant.chat_id)) is tenant:
+            del self._by_chat[str(tenant.chat_id)]
+        self._unlink_token(tenant)
+        tenant.practicum_token = fresh.practicum_token
+        tenant.chat_id = fresh.chat_id
+        self._by_chat.setdefault(str(tenant.chat_id), tenant)
+        self._by_token.setdefault(tenant.practicum_token, []).append(tenant)
+        self.version += 1
+        return tenant
+
+    def get(self, tenant_id):
+        """Возвращает получателя по идентификатору."""
+        return self._tenants.get(str(tenant_id))
+
+    def by_chat(self, chat_id):
+        """Возвращает получателя, которому принадлежит чат."""
+        return self._by_chat.get(str(chat_id))
+
+    def with_token(self, practicum_token):
+        """Получатели с токеном Практикума `practicum_token`."""
+        return list(self._by_token.get(practicum_token, ()))
+
+    def _unlink_token(self, tenant):
+        peers = self._by_token[tenant.practicum_token]
+        peers.remove(tenant)
+        if not peers:
+            del self._by_token[tenant.practicum_token]
+
+    def __iter__(self):
+        return iter(list(self._tenants.values()))
+
+    def __len__(self):
+        return len(self._tenants)
+
+    @classmethod
+    def from_file(cls, path):
+        """Загружает получателей из JSON-файла.
+
+        Файл содержит список объектов с ключами `practicum_token`,
+        `chat_id` и необязательным `id`.
+        """
+        try:
+            with open(path, encoding='utf-8') as config:
+                entries = json.load(config)
+        except (OSError, ValueError) as error:
+            raise TenantConfigError(
+                f'Не удалось прочитать {path}: {error}'
+            )
+        if not isinstance(entries, list):
+            raise TenantConfigError(f'{path} должен содержать список')
+        return cls(parse_tenant(entry) for entry in entries)
+
+
+def entry_id(entry):
+    """Идентификатор получателя из записи, как у `Tenant.tenant_id`."""
+    return str(entry.get('id') or entry.get('chat_id'))
+
+
+class TenantFile:
+    """Файл получателей, который перечитывается без перезапуска бота.
+
+    Изменение файла определяется по времени изменения и размеру. При
+    перечитывании проверяются только изменившиеся записи: ошибка в одной
+    из них не мешает остальным, а получатель сохраняет прежние данные.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = self._stat()
+        self._entries = {}
+        try:
+            self._entries = {
+                entry_id(entry): entry for entry in self._read()
+                if isinstance(entry, dict)
+            }
+        except TenantConfigError as error:
+            logging.error(error)
+
+    def changed(self):
+        """Изменился ли файл с прошлого чтения."""
+        return self._stat() != self._stamp
+
+    def reload(self, registry):
+        """Применяет изменения файла к реестру.
+
+        Возвращает списки добавленных, удаленных и измененных получателей.
+        """
+        self._stamp = self._stat()
+        try:
+            entries = self._read()
+        except TenantConfigError as error:
+            logging.error(error)
+            return [], [], []
+        added, updated = [], []
+        fresh = {}
+        for entry in entries:
+            if not isinstance(entry, dict) or entry_id(entry) in fresh:
+                logging.error(f'Пропущена запись получателя: {entry!r}')
+                continue
+            tenant_id = entry_id(entry)
+            fresh[tenant_id] = entry
+            if self._entries.get(tenant_id) == entry:
+                continue
+            try:
+                tenant = parse_tenant(entry)
+            except TenantConfigError as error:
+                logging.error(f'Получатель {tenant_id} не изменен: {error}')
+                fresh[tenant_id] = self._entries.get(tenant_id)
+                continue
+            if registry.get(tenant_id) is None:
+                registry.add(tenant)
+                added.append(tenant)
+            else:
+                updated.append(registry.update(tenant))
+        removed = [
+            tenant for tenant in map(
+                registry.remove, self._entries.keys() - fresh.keys()
+            ) if tenant is not None
+        ]
+        self._entries = {
+            tenant_id: entry for tenant_id, entry in fresh.items()
+            if entry is not None
+        }
+        return added, removed, updated
+
+    def watch(self, interval, on_change):
+        """Проверяет файл раз в `interval` секунд в фоновом потоке."""
+        def run():
+            stamp = self._stamp
+            while True:
+                time.sleep(interval)
+                current = self._stat()
+                if current != stamp:
+                    stamp = current
+                    on_change()
+
+        threading.Thread(target=run, name='tenants', daemon=True).start()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as config:
+                entries = json.load(config)
+        except (OSError, ValueError) as error:
+            raise TenantConfigError(
+                f'Не удалось прочитать {self.path}: {error}'
+            )
+        if not isinstance(entries, list):
+            raise TenantConfigError(f'{self.path} должен содержать список')
+        return entries
+
+
+def parse_tenant(entry):
+    """Создает получателя из записи конфигурации."""
+    if not isinstance(entry, dict):
+        raise TenantConfigError(f'Неверная запись получателя: {entry!r}')
+    token = entry.get('practicum_token')
+    chat_id = entry.get('chat_id')
+    if not token or not chat_id:
+        raise TenantConfigError(
+            "Получатель должен содержать 'practicum_token' и 'chat_id'"
+        )
+    return Tenant(token, chat_id, entry.get('id'))
+
+
+@contextmanager
+def activate(tenant):
+    """Делает получателя текущим для функций опроса и отправки."""
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
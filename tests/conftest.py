@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 import pytest_timeout
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,3 +54,65 @@ pytest_timeout.write = write_timeout_reasons
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+os.environ['STATE_DB'] = ':memory:'
+
+
+class FakeResponse:
+    """Ответ `requests.get` с телом `payload`."""
+
+    def __init__(self, payload=None, status_code=200, **attributes):
+        self.payload = payload
+        self.status_code = status_code
+        self.__dict__.update(attributes)
+
+    def json(self):
+        return self.payload
+
+
+class RecordingBot:
+    """Бот Telegram, который запоминает отправленные сообщения."""
+
+    def __init__(self, token=None):
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None):
+        self.messages.append((chat_id, text))
+
+    @property
+    def chats(self):
+        return [chat_id for chat_id, _ in self.messages]
+
+    @property
+    def texts(self):
+        return [text for _, text in self.messages]
+
+
+@pytest.fixture
+def api_response():
+    """Фабрика ответов API: `api_response(payload, status_code=200)`."""
+    return FakeResponse
+
+
+@pytest.fixture
+def bot():
+    return RecordingBot()
+
+
+@pytest.fixture
+def make_poller():
+    """Фабрика Poller с быстрой очередью отправки и базами в памяти."""
+    from homework import Poller, send_message
+    from outbound import RateLimiter, SendQueue
+    from outbox import Outbox
+    from state import StateStore
+
+    def make(bot, store=None, outbox=None, **kwargs):
+        sender = SendQueue(
+            bot, send_message,
+            limiter=RateLimiter(global_rate=1000, chat_rate=1000)
+        )
+        return Poller(
+            sender, store or StateStore(':memory:'),
+            outbox or Outbox(':memory:'), **kwargs
+        )
+    return make
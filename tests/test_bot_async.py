@@ -0,0 +1,169 @@
+import asyncio
+import os
+import signal
+import sqlite3
+
+from aiohttp import web
+
+import bot_async
+from outbox import Outbox
+from scheduler import AdaptiveScheduler
+from state import StateStore
+from tenants import Tenant, TenantRegistry
+
+
+async def start_fake_server(handled):
+    async def homework_statuses(request):
+        handled.append(('get', request.headers['Authorization']))
+        await asyncio.sleep(0.05)
+        return web.json_response({
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 1
+        })
+
+    async def send_message(request):
+        payload = await request.json()
+        handled.append(('send', payload['chat_id']))
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/homework_statuses/', homework_statuses)
+    app.router.add_post('/bottoken/sendMessage', send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+class TestBotAsync:
+
+    def test_poll_runs_tenants_concurrently(
+            self, monkeypatch, homework_module
+    ):
+        handled = []
+        tenants = [Tenant(f'token-{i}', i) for i in range(20)]
+
+        async def scenario():
+            runner, base_url = await start_fake_server(handled)
+            monkeypatch.setattr(
+                homework_module, 'ENDPOINT', f'{base_url}/homework_statuses/'
+            )
+            monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', 'token')
+            monkeypatch.setattr(
+                bot_async, 'TELEGRAM_API_URL',
+                base_url + '/bot{token}/{method}'
+            )
+            try:
+                async with bot_async.client_session(10) as http, \
+                        bot_async.client_session(5) as telegram:
+                    poller = bot_async.AsyncPoller(
+                        http, telegram, StateStore(':memory:'),
+                        Outbox(':memory:'), 10, 5
+                    )
+                    started = asyncio.get_running_loop().time()
+                    await poller.poll(tenants)
+                    return asyncio.get_running_loop().time() - started
+            finally:
+                await runner.cleanup()
+
+        elapsed = asyncio.run(scenario())
+        assert elapsed < 0.05 * len(tenants) / 2
+        assert sorted(chat for kind, chat in handled if kind == 'send') == (
+            list(range(20))
+        )
+        assert all(
+            tenant.index.status('hw') == 'approved'
+            for tenant in tenants
+        )
+
+    def test_shared_token_is_fetched_once(
+            self, monkeypatch, homework_module
+    ):
+        handled = []
+        tenants = [Tenant('shared', chat) for chat in (1, 2, 3)]
+        tenants.append(Tenant('own', 4))
+
+        async def scenario():
+            runner, base_url = await start_fake_server(handled)
+            monkeypatch.setattr(
+                homework_module, 'ENDPOINT', f'{base_url}/homework_statuses/'
+            )
+            monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', 'token')
+            monkeypatch.setattr(
+                bot_async, 'TELEGRAM_API_URL',
+                base_url + '/bot{token}/{method}'
+            )
+            try:
+                async with bot_async.client_session(10) as http, \
+                        bot_async.client_session(5) as telegram:
+                    poller = bot_async.AsyncPoller(
+                        http, telegram, StateStore(':memory:'),
+                        Outbox(':memory:'), 10, 5
+                    )
+                    return await poller.poll(tenants)
+            finally:
+                await runner.cleanup()
+
+        assert asyncio.run(scenario()) == [True] * 4
+        assert sorted(kind for kind, _ in handled if kind == 'get') == (
+            ['get', 'get']
+        )
+        assert sorted(chat for kind, chat in handled if kind == 'send') == (
+            [1, 2, 3, 4]
+        )
+
+    def test_run_survives_cycle_errors(self, monkeypatch, homework_module):
+        handled = []
+
+        class InstantScheduler(AdaptiveScheduler):
+            def advance(self):
+                super().advance()
+                return 0
+
+        def create_scheduler(tenants=()):
+            scheduler = InstantScheduler(600, 120, 3600)
+            scheduler.add(tenants)
+            return scheduler
+
+        class LockedOutbox(Outbox):
+            locked = True
+
+            def pending(self):
+                if self.locked:
+                    self.locked = False
+                    raise sqlite3.OperationalError('database is locked')
+                return super().pending()
+
+        def locked(store):
+            raise sqlite3.OperationalError('database is locked')
+
+        async def scenario():
+            runner, base_url = await start_fake_server(handled)
+            monkeypatch.setattr(
+                homework_module, 'ENDPOINT', f'{base_url}/homework_statuses/'
+            )
+            monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', 'token')
+            monkeypatch.setattr(
+                homework_module, 'create_scheduler', create_scheduler
+            )
+            monkeypatch.setattr(
+                bot_async, 'TELEGRAM_API_URL',
+                base_url + '/bot{token}/{method}'
+            )
+            monkeypatch.setattr(StateStore, 'maybe_flush', locked)
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.3, os.kill, os.getpid(), signal.SIGTERM)
+            try:
+                await bot_async.run(
+                    TenantRegistry([Tenant('token', 1)]),
+                    StateStore(':memory:'), LockedOutbox(':memory:')
+                )
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(scenario())
+        assert [kind for kind, _ in handled].count('get') > 1, (
+            'Сбой цикла не должен останавливать опрос'
+        )
@@ -0,0 +1,107 @@
+import tracemalloc
+
+import pytest
+
+from changes import HOMEWORK_VERDICTS, ChangeIndex
+from tenants import Tenant
+
+
+def homework(homework_id, status, date_updated='2021-04-11T10:31:09Z'):
+    return {
+        'id': homework_id,
+        'homework_name': f'hw{homework_id}',
+        'status': status,
+        'date_updated': date_updated,
+    }
+
+
+class TestChangeIndex:
+
+    @pytest.mark.parametrize('status', HOMEWORK_VERDICTS)
+    def test_every_verdict_is_encoded(self, status):
+        index = ChangeIndex()
+        index.update(homework(1, status))
+        index.restore('2', status, 'not a date')
+        assert index.status('1') == index.status('2') == status
+        assert index.count(status) == 2
+
+    def test_diff_returns_only_transitions(self):
+        index = ChangeIndex()
+        first, second = homework(1, 'reviewing'), homework(2, 'approved')
+        assert index.diff([second, first]) == [first, second]
+        index.update(first)
+        assert index.diff([second, first]) == [second]
+        index.update(second)
+        rejected = homework(1, 'rejected', '2021-04-12T10:00:00Z')
+        assert index.diff([rejected, second]) == [rejected]
+        assert index.status('1') == 'reviewing'
+
+    def test_unknown_status_is_reported(self):
+        index = ChangeIndex()
+        broken = homework(1, 'unknown')
+        assert index.diff([broken]) == [broken]
+
+    def test_all_changes_in_response_are_sent(self, homework_module):
+        tenant = Tenant('token', 1)
+        tenant.timestamp = 500
+        response = {
+            'homeworks': [
+                homework(2, 'approved'),
+                homework(3, 'unknown'),
+                homework(1, 'rejected'),
+            ],
+            'current_date': 1000,
+        }
+        changes = homework_module.status_changes(tenant, response)
+        assert [item['id'] for item, _ in changes] == [1, 2]
+        assert changes[1][1].endswith(
+            homework_module.HOMEWORK_VERDICTS['approved']
+        )
+
+    def test_first_poll_notifies_only_newest(self, homework_module):
+        tenant = Tenant('token', 1)
+        history = [homework(number, 'approved') for number in range(25, 0, -1)]
+        changes = homework_module.status_changes(
+            tenant, {'homeworks': history, 'current_date': 1000}
+        )
+        assert len(changes) == 25
+        assert [item['id'] for item, message in changes if message] == [25]
+        assert changes[0][1].startswith('Изменился статус')
+
+    def test_dates_are_packed_into_ints(self):
+        index = ChangeIndex()
+        index.update(homework(7, 'approved', '2024-01-01T10:00:00Z'))
+        assert index._seen == {7: 1704103200 << 2 | 1}
+        assert index.status('7') == 'approved'
+        assert '7' in index
+        assert not index.changed(
+            homework(7, 'approved', '2024-01-01T10:00:00Z')
+        )
+        assert index.changed(homework(7, 'approved', '2024-01-01T10:00:01Z'))
+
+    @pytest.mark.parametrize('date_updated', [
+        None, '2024-13-01T10:00:00Z', '2024-01-01 10:00:00', 1704103200
+    ])
+    def test_unusual_dates_are_compared_exactly(self, date_updated):
+        index = ChangeIndex()
+        index.update(homework(1, 'reviewing', date_updated))
+        assert not index.changed(homework(1, 'reviewing', date_updated))
+        assert index.changed(homework(1, 'approved', date_updated))
+        assert index.count('reviewing') == 1
+
+    def test_state_fits_in_small_memory(self):
+        tracemalloc.start()
+        try:
+            tenants = [Tenant(f'token-{number}', number) for number in range(
+                200
+            )]
+            for number, tenant in enumerate(tenants):
+                for homework_id in range(number * 10, number * 10 + 10):
+                    tenant.index.update(homework(
+                        homework_id, 'approved',
+                        f'2024-01-01T10:{homework_id % 60:02}:00Z'
+                    ))
+            used, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert used / 2000 < 200, 'Ожидается до 200 байт на работу'
@@ -0,0 +1,95 @@
+import requests
+
+import homework
+from lifecycle import Lifecycle
+from tenants import Tenant, TenantRegistry
+
+
+def payload(current_date):
+    return {
+        'homeworks': [{
+            'id': 1, 'homework_name': 'hw.zip', 'status': 'approved',
+            'date_updated': '2024-01-01T10:00:00Z'
+        }],
+        'current_date': current_date
+    }
+
+
+class OnlyGet(TenantRegistry):
+    """Реестр, который нельзя обходить целиком."""
+
+    def __iter__(self):
+        raise AssertionError('Цикл не должен обходить реестр')
+
+
+class TestCoalescing:
+
+    def test_shared_token_is_polled_once(
+        self, monkeypatch, api_response, bot, make_poller
+    ):
+        calls = []
+
+        def fake_get(url, headers=None, params=None, **kwargs):
+            calls.append((headers['Authorization'], params['from_date']))
+            return api_response(payload(1000))
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        student, mentor, other = (
+            Tenant('shared', 1), Tenant('shared', 2), Tenant('own', 3)
+        )
+        mentor.timestamp = 500
+        poller = make_poller(bot)
+        results = dict(
+            poller.poll_all([student, mentor, other], Lifecycle())
+        )
+        poller.sender.close()
+        assert results == {student: True, mentor: True, other: True}
+        assert calls == [('OAuth shared', 0), ('OAuth own', 0)], (
+            'Общий токен опрашивается один раз с самым ранним курсором'
+        )
+        assert sorted(bot.chats) == [1, 2, 3]
+        assert student.timestamp == mentor.timestamp == 1000 - (
+            homework.CURSOR_OVERLAP
+        )
+
+    def test_known_statuses_are_not_resent(
+        self, monkeypatch, api_response, bot, make_poller
+    ):
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: api_response(payload(1000))
+        )
+        old, new = Tenant('shared', 1), Tenant('shared', 2)
+        old.index.update(payload(0)['homeworks'][0])
+        poller = make_poller(bot)
+        assert poller.poll_group([old, new]) == [False, True]
+        poller.sender.close()
+        assert bot.chats == [2]
+
+    def test_failed_fetch_marks_whole_group(
+        self, monkeypatch, bot, make_poller
+    ):
+        def broken_get(*args, **kwargs):
+            raise requests.exceptions.ConnectionError()
+
+        monkeypatch.setattr(requests, 'get', broken_get)
+        poller = make_poller(bot)
+        poller.caller.policy.attempts = 0
+        group = [Tenant('shared', 1), Tenant('shared', 2)]
+        assert poller.poll_group(group) == [False, False]
+        poller.sender.close()
+
+    def test_peers_of_due_tenants_join_the_cycle(self):
+        registry = TenantRegistry([
+            Tenant('shared', 1), Tenant('own', 2), Tenant('shared', 3)
+        ])
+        due = [registry.get(1)]
+        assert homework.with_peers(due, registry) == [
+            registry.get(1), registry.get(3)
+        ]
+        assert homework.with_peers(due, OnlyGet(registry)) == [
+            registry.get(1), registry.get(3)
+        ], 'Соседи ищутся по индексу токенов, без обхода реестра'
+        assert homework.group_by_token(registry) == [
+            [registry.get(1), registry.get(3)], [registry.get(2)]
+        ]
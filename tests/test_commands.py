@@ -0,0 +1,129 @@
+import threading
+import time
+
+import requests
+
+from commands import UNKNOWN_CHAT, CommandHandler
+from homework import redrive
+from state import StateStore
+from tenants import Tenant, TenantRegistry
+
+HOMEWORKS = [
+    {'id': 1, 'homework_name': 'hw1.zip', 'status': 'reviewing',
+     'date_updated': '2023-05-01T10:00:00Z'},
+    {'id': 1, 'homework_name': 'hw1.zip', 'status': 'approved',
+     'date_updated': '2023-05-02T10:00:00Z'},
+    {'id': 2, 'homework_name': 'hw2.zip', 'status': 'rejected',
+     'date_updated': '2023-05-03T10:00:00Z'},
+]
+
+
+def make_handler(tmp_path, now=1000, checked=990):
+    store = StateStore(tmp_path / 'state.sqlite3')
+    tenant = Tenant('token', 42)
+    for homework in HOMEWORKS:
+        store.record_status(tenant, homework)
+    tenant.checked = checked
+    refreshed = []
+    handler = CommandHandler(
+        TenantRegistry([tenant]), store, refreshed.append, ttl=60,
+        clock=lambda: now
+    )
+    return handler, store, refreshed
+
+
+class TestCommands:
+
+    def test_status_and_history_from_state(self, tmp_path):
+        handler, store, refreshed = make_handler(tmp_path)
+        status = handler.status(42)
+        assert status.splitlines()[1:] == [
+            '2023-05-03T10:00:00Z — hw2.zip: возвращена с замечаниями',
+            '2023-05-02T10:00:00Z — hw1.zip: принята',
+        ]
+        store.flush()
+        assert handler.status(42) == status, (
+            'Сохраненные и буферизованные изменения должны давать один ответ'
+        )
+        history = handler.history(42).splitlines()[1:]
+        assert len(history) == 3
+        assert history[-1].endswith('hw1.zip: на проверке')
+        assert refreshed == [], 'Свежие данные не требуют запроса к API'
+
+    def test_stale_state_refreshes_in_background(self, tmp_path):
+        handler, _, _ = make_handler(tmp_path, now=1000, checked=900)
+        release, refreshed = threading.Event(), []
+
+        def refresh(tenant):
+            release.wait(1)
+            refreshed.append(tenant.tenant_id)
+
+        handler.refresh = refresh
+        started = time.monotonic()
+        assert handler.status('42').startswith('Статусы работ:')
+        handler.history('42')
+        assert time.monotonic() - started < 0.5, 'Ответ не ждет запроса к API'
+        release.set()
+        deadline = time.monotonic() + 1
+        while handler._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert refreshed == ['42'], 'Одновременно идет один фоновый опрос'
+
+    def test_checked_is_restored_from_cursor(self, tmp_path):
+        store = StateStore(tmp_path / 'state.sqlite3')
+        tenant = Tenant('token', 42)
+        store.record_cursor(tenant, 1700000000)
+        store.flush()
+        restored = Tenant('token', 42)
+        store.load(restored)
+        assert restored.checked == 1700000000
+
+    def test_unknown_chat(self, tmp_path):
+        handler, _, refreshed = make_handler(tmp_path)
+        assert handler.history(7) == UNKNOWN_CHAT
+        assert refreshed == []
+
+    def test_register_replies_to_commands(self, tmp_path):
+        handler, _, _ = make_handler(tmp_path)
+        handlers, replies = {}, []
+
+        class Bot:
+            def register_message_handler(self, callback, commands=None):
+                handlers[commands[0]] = callback
+
+            def reply_to(self, message, text):
+                replies.append(text)
+
+        class Message:
+            class chat:
+                id = 42
+
+        handler.register(Bot())
+        handlers['status'](Message())
+        assert replies[0].startswith('Статусы работ:')
+
+    def test_refresh_and_redrive_send_once(
+        self, monkeypatch, api_response, make_poller
+    ):
+        started, release, messages = threading.Event(), threading.Event(), []
+
+        class SlowBot:
+            def send_message(self, chat_id=None, text=None):
+                started.set()
+                release.wait(1)
+                messages.append(text)
+
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            api_response({'current_date': 1000, 'homeworks': HOMEWORKS[2:]})
+        ))
+        poller = make_poller(SlowBot())
+        registry = TenantRegistry([Tenant('token', 42)])
+        handler = CommandHandler(
+            registry, poller.store, poller.poll_tenant, ttl=60
+        )
+        handler.status(42)
+        assert started.wait(1)
+        redrive(poller.outbox, poller.sender, registry)
+        release.set()
+        poller.sender.close(timeout=1)
+        assert len(messages) == 1, 'Уведомление не должно уйти дважды'
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+import decoding
+
+BODY = b'{"homeworks": [{"id": 1, "status": "approved"}], "current_date": 5}'
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize('backend', ['json', 'orjson'])
+    def test_backends_agree(self, backend):
+        loads = decoding.select_loads(backend)
+        assert loads(BODY) == json.loads(BODY)
+        assert loads('{"value": NaN}')['value'] != 0, (
+            'Данные, допустимые для stdlib, должны декодироваться'
+        )
+
+    @pytest.mark.parametrize('backend', ['json', 'orjson'])
+    def test_errors_are_json_decode_errors(self, backend):
+        with pytest.raises(json.JSONDecodeError):
+            decoding.select_loads(backend)(b'{"homeworks": [')
+
+    def test_falls_back_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(decoding, 'find_orjson', lambda: None)
+        assert decoding.select_loads('auto') is decoding.stdlib_loads
+        assert decoding.select_loads('orjson') is decoding.stdlib_loads
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            decoding.select_loads('simdjson')
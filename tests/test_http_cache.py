@@ -0,0 +1,86 @@
+import json
+
+import requests
+
+from http_cache import ResponseCache
+from tenants import Tenant
+
+PAYLOAD = {
+    'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 100
+}
+
+
+class TestResponseCache:
+
+    def test_validators_sent_for_same_cursor(self):
+        cache = ResponseCache()
+        tenant = Tenant('token', 1)
+        cache.store(
+            tenant, 10, {'ETag': '"v1"', 'Last-Modified': 'Mon'},
+            json.dumps(PAYLOAD).encode(), json.loads
+        )
+        headers = cache.request_headers(tenant, 10, tenant.headers)
+        assert headers['If-None-Match'] == '"v1"'
+        assert headers['If-Modified-Since'] == 'Mon'
+        assert headers['Authorization'] == 'OAuth token'
+        assert 'If-None-Match' not in cache.request_headers(tenant, 20, {})
+
+    def test_same_homeworks_return_cached_object(self):
+        cache = ResponseCache()
+        tenant = Tenant('token', 1)
+        decoded = []
+
+        def decode(body):
+            decoded.append(body)
+            return json.loads(body)
+
+        body = json.dumps(PAYLOAD).encode()
+        first = cache.store(tenant, 10, {}, body, decode)
+        assert cache.store(tenant, 10, {}, body, decode) is first
+        assert len(decoded) == 1, 'Одинаковое тело не нужно декодировать'
+        later = json.dumps({**PAYLOAD, 'current_date': 200}).encode()
+        assert cache.store(tenant, 10, {}, later, decode) is first
+        assert not cache.unchanged(tenant, first)
+        cache.confirm(tenant, first)
+        assert cache.unchanged(tenant, first)
+        changed = json.dumps({'homeworks': [], 'current_date': 300}).encode()
+        assert cache.store(tenant, 10, {}, changed, decode) is not first
+
+    def test_not_modified_poll_skips_processing(
+            self, monkeypatch, homework_module, api_response, bot,
+            make_poller
+    ):
+        requests_headers = []
+        responses = iter([
+            api_response(
+                headers={'ETag': '"v1"'}, content=json.dumps(PAYLOAD).encode()
+            ),
+            api_response(
+                headers={'ETag': '"v1"'}, content=json.dumps(PAYLOAD).encode()
+            ),
+            api_response(status_code=304, headers={}),
+        ])
+
+        def fake_get(url, headers=None, **kwargs):
+            requests_headers.append(headers)
+            return next(responses)
+
+        def fail_check(response):
+            raise AssertionError('Неизменный ответ не нужно проверять')
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        tenant = Tenant('token', 1)
+        poller = make_poller(bot)
+        assert poller.poll_tenant(tenant)
+        poller.sender.join()
+        monkeypatch.setattr(homework_module, 'check_response', fail_check)
+        assert not poller.poll_tenant(tenant)
+        assert not poller.poll_tenant(tenant)
+        poller.sender.close()
+        assert len(bot.messages) == 1
+        assert 'If-None-Match' not in requests_headers[1], (
+            'Валидаторы относятся к прежнему from_date'
+        )
+        assert requests_headers[2]['If-None-Match'] == '"v1"'
+        assert tenant.timestamp == 40
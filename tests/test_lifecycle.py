@@ -0,0 +1,206 @@
+import inspect
+import signal
+import sqlite3
+import threading
+import time
+
+import pytest
+import requests
+import telebot
+
+import homework
+from exceptions import ShutdownRequested, WakeUp
+from lifecycle import Lifecycle
+from outbound import RateLimiter, SendQueue
+from outbox import Outbox
+from scheduler import AdaptiveScheduler
+from state import StateStore
+from tenants import Tenant
+
+
+@pytest.fixture
+def lifecycle():
+    lifecycle = Lifecycle()
+    lifecycle.install()
+    yield lifecycle
+    lifecycle.uninstall()
+
+
+def later(action, delay=0.05):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+
+class InstantScheduler(AdaptiveScheduler):
+    """Планировщик, логическое время которого идет без ожидания."""
+
+    def advance(self):
+        super().advance()
+        return 0
+
+
+def instant_scheduler(tenants=()):
+    scheduler = InstantScheduler(600, 120, 3600)
+    scheduler.add(tenants)
+    return scheduler
+
+
+class TestLifecycle:
+
+    def test_wake_interrupts_sleep(self, lifecycle):
+        started = time.monotonic()
+        later(lifecycle.wake)
+        with pytest.raises(WakeUp):
+            with lifecycle.sleeping():
+                time.sleep(5)
+        assert time.monotonic() - started < 1
+        assert not lifecycle.stopping
+
+    def test_stop_signal_interrupts_sleep(self, lifecycle):
+        later(lambda: signal.pthread_kill(
+            threading.main_thread().ident, signal.SIGTERM
+        ))
+        with pytest.raises(ShutdownRequested):
+            with lifecycle.sleeping():
+                time.sleep(5)
+        assert lifecycle.stopping
+
+    def test_stop_outside_sleep_is_deferred(self, lifecycle):
+        lifecycle.stop()
+        assert lifecycle.stopping, 'Опрос не должен обрываться посередине'
+        with pytest.raises(ShutdownRequested):
+            with lifecycle.sleeping():
+                pass
+
+    def test_wake_outside_sleep_is_ignored(self, lifecycle):
+        lifecycle.wake()
+        with lifecycle.sleeping():
+            pass
+
+    def test_uninstall_restores_handlers(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        lifecycle = Lifecycle()
+        lifecycle.install()
+        assert signal.getsignal(signal.SIGTERM) != previous
+        lifecycle.uninstall()
+        assert signal.getsignal(signal.SIGTERM) == previous
+
+    def test_send_queue_close_is_bounded(self):
+        sent, release = [], threading.Event()
+
+        def send(bot, message):
+            release.wait(1)
+            sent.append(message)
+
+        sender = SendQueue(None, send, workers=1)
+        tenant = Tenant('token', 1)
+        for number in range(3):
+            sender.put(tenant, number)
+        started = time.monotonic()
+        sender.close(timeout=0.1)
+        assert time.monotonic() - started < 0.5
+        release.set()
+        sender.threads[0].join(1)
+        assert sent == [0], 'После срока остановки сообщения не отправляются'
+
+    def test_send_queue_close_with_full_queue_is_bounded(self):
+        sent, release = [], threading.Event()
+
+        def send(bot, message):
+            release.wait(1)
+            sent.append(message)
+
+        sender = SendQueue(None, send, workers=1, maxsize=2)
+        tenant = Tenant('token', 1)
+        for number in range(3):
+            sender.put(tenant, number)
+        assert sender.queues[0].full()
+        started = time.monotonic()
+        sender.close(timeout=0.1)
+        assert time.monotonic() - started < 0.5, (
+            'Заполненная очередь не задерживает остановку'
+        )
+        release.set()
+        sender.threads[0].join(1)
+        assert not sender.threads[0].is_alive()
+        assert sent == [0], 'После срока остановки сообщения не отправляются'
+
+    def test_stop_interrupts_cycle_drain(self, lifecycle):
+        release = threading.Event()
+        sender = SendQueue(
+            None, lambda bot, message: release.wait(1), workers=1,
+            limiter=RateLimiter(1000, 1000)
+        )
+        poller = homework.Poller(
+            sender, StateStore(':memory:'), Outbox(':memory:')
+        )
+        for number in range(6):
+            sender.put(Tenant('token', 1), number)
+        later(lambda: signal.pthread_kill(
+            threading.main_thread().ident, signal.SIGTERM
+        ))
+        started = time.monotonic()
+        with pytest.raises(ShutdownRequested):
+            poller.drain(lifecycle)
+        poller.close(timeout=0.2)
+        assert time.monotonic() - started < 0.6, (
+            'Срок остановки действует и для сигнала посреди цикла'
+        )
+        release.set()
+
+    def test_main_stops_on_sigterm_and_flushes_state(
+        self, monkeypatch, tmp_path, api_response, bot
+    ):
+        response = api_response({'current_date': 1000, 'homeworks': [{
+            'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'
+        }]})
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(homework, 'STATE_DB', str(tmp_path / 'db'))
+        monkeypatch.setattr(requests, 'get', lambda *args, **kw: response)
+        monkeypatch.setattr(telebot, 'TeleBot', lambda token=None: bot)
+        later(lambda: signal.pthread_kill(
+            threading.main_thread().ident, signal.SIGTERM
+        ), delay=0.3)
+        # test_bot заменяет homework.main оберткой с таймаутом.
+        inspect.unwrap(homework.main)()
+        assert len(bot.messages) == 1
+        store = StateStore(tmp_path / 'db')
+        tenant = Tenant('token', '1')
+        store.load(tenant)
+        store.close()
+        assert tenant.timestamp == 1000 - homework.CURSOR_OVERLAP, (
+            'Состояние сохраняется при остановке'
+        )
+
+    def test_main_survives_cycle_errors(
+        self, monkeypatch, tmp_path, api_response, bot
+    ):
+        polls = []
+
+        def get(*args, **kwargs):
+            polls.append(kwargs['params']['from_date'])
+            if len(polls) == 3:
+                signal.pthread_kill(
+                    threading.main_thread().ident, signal.SIGTERM
+                )
+            return api_response({'current_date': 1000, 'homeworks': []})
+
+        def locked(store):
+            raise sqlite3.OperationalError('database is locked')
+
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'token')
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(homework, 'STATE_DB', str(tmp_path / 'db'))
+        monkeypatch.setattr(homework, 'create_scheduler', instant_scheduler)
+        monkeypatch.setattr(StateStore, 'maybe_flush', locked)
+        monkeypatch.setattr(requests, 'get', get)
+        monkeypatch.setattr(telebot, 'TeleBot', lambda token=None: bot)
+        errors = []
+        monkeypatch.setattr(homework.logging, 'error', errors.append)
+        inspect.unwrap(homework.main)()
+        assert len(polls) == 3, 'Сбой цикла не должен останавливать опрос'
+        assert 'Сбой в работе программы: database is locked' in errors
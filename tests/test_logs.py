@@ -0,0 +1,73 @@
+import json
+import logging
+
+from logs import JsonFormatter, RepeatFilter, queue_logging, worker_log_file
+from tenants import Tenant, activate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(message, **extra):
+    record = logging.LogRecord(
+        'root', logging.ERROR, __file__, 1, message, None, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogs:
+
+    def test_repeated_errors_are_throttled(self):
+        clock = FakeClock()
+        repeat_filter = RepeatFilter(burst=2, period=60, clock=clock)
+        message = 'Сбой в работе программы: API недоступно'
+        passed = [
+            repeat_filter.filter(make_record(message)) for _ in range(5)
+        ]
+        assert passed == [True, True, False, False, False]
+        assert repeat_filter.filter(make_record('Другая ошибка'))
+
+        clock.now = 61
+        record = make_record(message)
+        assert repeat_filter.filter(record)
+        assert record.getMessage().endswith('(подавлено повторов: 3)')
+
+    def test_json_lines_with_context(self):
+        record = make_record('text', tenant_id='42', homework_id='7')
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['message'] == 'text'
+        assert entry['tenant'] == '42'
+        assert entry['homework'] == '7'
+        assert entry['level'] == 'ERROR'
+
+    def test_queue_writes_in_background(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler, listener = queue_logging(
+            logging.FileHandler(path, encoding='utf-8'), json_lines=True
+        )
+        logger = logging.getLogger('tests.queue_logging')
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            with activate(Tenant('token', 5)):
+                logger.error('Сообщение')
+        finally:
+            listener.stop()
+            logger.removeHandler(handler)
+        entry = json.loads(path.read_text(encoding='utf-8'))
+        assert entry == {
+            'time': entry['time'], 'level': 'ERROR',
+            'message': 'Сообщение', 'tenant': '5'
+        }
+
+    def test_worker_log_file(self):
+        assert worker_log_file('bot_log.log', None) == 'bot_log.log'
+        assert worker_log_file(
+            'logs/bot_log.log', 'worker-1'
+        ) == 'logs/bot_log.worker-1.log'
@@ -0,0 +1,76 @@
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, Registry
+
+
+class TestMetrics:
+
+    def test_prometheus_text_format(self):
+        registry = Registry()
+        polls = registry.register(
+            Counter('polls_total', 'Опросы', ('tenant',))
+        )
+        seconds = registry.register(
+            Histogram('fetch_seconds', 'Запросы', buckets=(0.1, 1))
+        )
+        polls.inc('a"b')
+        seconds.observe(0.05)
+        seconds.observe(5)
+        assert registry.render().splitlines() == [
+            '# HELP polls_total Опросы',
+            '# TYPE polls_total counter',
+            'polls_total{tenant="a\\"b"} 1',
+            '# HELP fetch_seconds Запросы',
+            '# TYPE fetch_seconds histogram',
+            'fetch_seconds_bucket{le="0.1"} 1',
+            'fetch_seconds_bucket{le="1"} 1',
+            'fetch_seconds_bucket{le="+Inf"} 2',
+            'fetch_seconds_sum 5.05',
+            'fetch_seconds_count 2',
+        ]
+
+    def test_timed_records_outcome(self):
+        before = metrics.STAGE_TOTAL.value('validate', 'error')
+        with pytest.raises(TypeError):
+            with metrics.timed('validate'):
+                raise TypeError
+        assert metrics.STAGE_TOTAL.value('validate', 'error') == before + 1
+
+    def test_span_hooks_see_stage_and_error(self):
+        spans = []
+
+        def broken(stage, seconds, error):
+            raise RuntimeError
+
+        def hook(stage, seconds, error):
+            spans.append((stage, type(error)))
+
+        metrics.add_span_hook(broken)
+        metrics.add_span_hook(hook)
+        try:
+            with metrics.timed('parse'):
+                pass
+            with pytest.raises(ValueError):
+                with metrics.timed('send'):
+                    raise ValueError
+        finally:
+            metrics.remove_span_hook(broken)
+            metrics.remove_span_hook(hook)
+        assert spans == [('parse', type(None)), ('send', ValueError)]
+        assert metrics.SPAN_HOOKS == []
+
+    def test_http_endpoint(self):
+        server = metrics.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics', timeout=1
+            ) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE homework_bot_stage_seconds histogram' in body
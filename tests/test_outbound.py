@@ -0,0 +1,90 @@
+import pytest
+
+import outbound
+from exceptions import SendMessageError
+from outbound import (RateLimiter, SendQueue, TokenBucket, is_group_chat,
+                      telegram_retry_after)
+from tenants import Tenant
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOutbound:
+
+    def test_token_bucket_spaces_sends(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        assert [bucket.reserve(0) for _ in range(4)] == [0, 0, 0.5, 1]
+        assert bucket.reserve(10) == 0
+
+    def test_limiter_applies_chat_and_global_limits(self):
+        clock = FakeClock()
+        limiter = RateLimiter(global_rate=3, chat_rate=1, clock=clock)
+        assert limiter.reserve(1) == 0
+        assert limiter.reserve(1) == 1
+        assert limiter.reserve(2) == 0
+        assert limiter.reserve(3) == pytest.approx(1 / 3)
+
+    def test_group_chats_are_limited_per_minute(self):
+        clock = FakeClock()
+        limiter = RateLimiter(
+            global_rate=1000, chat_rate=1000, group_burst=3, clock=clock
+        )
+        burst = [limiter.reserve('-100') for _ in range(3)]
+        assert max(burst) < 0.01
+        assert limiter.reserve('-100') == pytest.approx(3, abs=0.01)
+        assert limiter.reserve('-200') < 0.01, 'Лимит у каждой группы свой'
+        assert max(limiter.reserve('5') for _ in range(4)) < 0.01
+        clock.now = 6
+        assert limiter.reserve('-100') < 0.01
+
+    def test_group_chat_detection(self):
+        assert is_group_chat(-1001234567890)
+        assert is_group_chat('-42')
+        assert is_group_chat('@channel')
+        assert not is_group_chat('12345')
+        assert not is_group_chat(7)
+
+    def test_retry_after_is_parsed(self):
+        assert telegram_retry_after(
+            {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 3}}
+        ) == 3
+        assert telegram_retry_after({'ok': False}) is None
+        assert telegram_retry_after(None) is None
+
+    def test_throttled_message_is_resent(self, monkeypatch):
+        slept, sent = [], []
+        monkeypatch.setattr(outbound.time, 'sleep', slept.append)
+        answers = [SendMessageError(retry_after=2), None]
+
+        def send(bot, message):
+            answer = answers.pop(0)
+            if answer:
+                raise answer
+            sent.append(message)
+
+        sender = SendQueue(None, send, limiter=RateLimiter(), workers=1)
+        sender.put(Tenant('token', 1), 'text')
+        sender.close()
+        assert sent == ['text']
+        assert 2 in slept
+
+    def test_chat_order_is_kept(self, monkeypatch):
+        monkeypatch.setattr(outbound.time, 'sleep', lambda delay: None)
+        sent = []
+        sender = SendQueue(
+            None, lambda bot, message: sent.append(message), workers=4
+        )
+        tenants = [Tenant('token', chat_id) for chat_id in range(5)]
+        for number in range(20):
+            sender.put(tenants[number % 5], number)
+        sender.close()
+        for chat_id in range(5):
+            assert [n for n in sent if n % 5 == chat_id] == list(
+                range(chat_id, 20, 5)
+            )
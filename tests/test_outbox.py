@@ -0,0 +1,136 @@
+import sqlite3
+
+import metrics
+from outbound import RateLimiter, SendQueue
+from outbox import Outbox
+from tenants import Tenant, TenantRegistry
+
+HOMEWORK = {
+    'id': 7, 'homework_name': 'hw', 'status': 'approved',
+    'date_updated': '2021-04-11T10:31:09Z'
+}
+
+
+class TestOutbox:
+
+    def test_add_is_idempotent(self):
+        now = [1000]
+        outbox = Outbox(':memory:', lease=60, clock=lambda: now[0])
+        tenant = Tenant('token', 1)
+        key = outbox.add(tenant, HOMEWORK, 'text')
+        assert key == '1:7:approved:2021-04-11T10:31:09Z'
+        assert outbox.add(tenant, HOMEWORK, 'text') is None
+        assert outbox.pending() == [], 'Новая запись уже в отправке'
+        now[0] += 60
+        assert outbox.pending() == [(key, '1', 'text')]
+
+    def test_failed_send_waits_for_backoff(self):
+        now = [1000]
+        outbox = Outbox(':memory:', retry_delay=30, clock=lambda: now[0])
+        tenant = Tenant('token', 1)
+        sent = outbox.add(tenant, HOMEWORK, 'sent')
+        failed = outbox.add(
+            tenant, dict(HOMEWORK, status='rejected'), 'failed'
+        )
+        outbox.settle(sent, True)
+        outbox.settle(failed, False)
+        assert outbox.pending() == []
+        now[0] += 30
+        assert [row[0] for row in outbox.pending()] == [failed]
+        outbox.settle(failed, False)
+        now[0] += 59
+        assert outbox.pending() == [], 'Пауза должна удвоиться'
+        now[0] += 1
+        assert [row[0] for row in outbox.pending()] == [failed]
+
+    def test_long_outage_is_not_lost(self, homework_module):
+        now = [0]
+        outbox = Outbox(
+            ':memory:', max_attempts=3, retry_delay=10, max_retry_delay=60,
+            clock=lambda: now[0]
+        )
+        tenant = Tenant('token', 1)
+        registry = TenantRegistry([tenant])
+        outage = [True]
+        delivered = []
+
+        def send(bot, message):
+            if outage[0]:
+                raise homework_module.SendMessageError()
+            delivered.append(message)
+
+        sender = SendQueue(
+            None, send, limiter=RateLimiter(1000, 1000), attempts=1,
+            on_result=outbox.settle
+        )
+        stuck = metrics.OUTBOX_STUCK.value()
+        outbox.add(tenant, HOMEWORK, 'text')
+        for cycle in range(40):
+            if cycle == 30:
+                outage[0] = False
+            homework_module.redrive(outbox, sender, registry)
+            sender.join()
+            now[0] += 12
+        sender.close()
+        assert delivered == ['text']
+        assert metrics.OUTBOX_STUCK.value() == stuck + 1
+        assert outbox.add(tenant, HOMEWORK, 'text') is None
+
+    def test_requeue_resets_backoff(self):
+        outbox = Outbox(':memory:', clock=lambda: 0)
+        key = outbox.add(Tenant('token', 1), HOMEWORK, 'text')
+        for _ in range(12):
+            outbox.settle(key, False)
+        assert outbox.pending() == []
+        assert outbox.requeue() == 1
+        assert outbox.pending() == [(key, '1', 'text')]
+
+    def test_old_schema_is_migrated(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE outbox (key TEXT PRIMARY KEY, tenant_id TEXT '
+            'NOT NULL, message TEXT NOT NULL, attempts INTEGER NOT NULL '
+            'DEFAULT 0, created REAL NOT NULL, sent REAL)'
+        )
+        connection.execute(
+            "INSERT INTO outbox VALUES ('k', '1', 'text', 3, 0, NULL)"
+        )
+        connection.commit()
+        connection.close()
+        assert Outbox(path).pending() == [('k', '1', 'text')]
+
+    def test_prune_keeps_recent_keys(self):
+        outbox = Outbox(':memory:', keep_sent=3600)
+        tenant = Tenant('token', 1)
+        outbox.settle(outbox.add(tenant, HOMEWORK, 'text'), True)
+        outbox.prune()
+        assert outbox.add(tenant, HOMEWORK, 'text') is None
+        outbox.keep_sent = -1
+        outbox.prune()
+        assert outbox.add(tenant, HOMEWORK, 'text') is not None
+
+    def test_failed_send_is_redriven(self, homework_module):
+        outbox = Outbox(':memory:', retry_delay=0)
+        tenant = Tenant('token', 1)
+        registry = TenantRegistry([tenant])
+        outcomes = [False, True]
+        delivered = []
+
+        def send(bot, message):
+            if not outcomes.pop(0):
+                raise homework_module.SendMessageError()
+            delivered.append(message)
+
+        sender = SendQueue(
+            None, send, limiter=RateLimiter(chat_rate=100), attempts=1,
+            on_result=outbox.settle
+        )
+        key = outbox.add(tenant, HOMEWORK, 'text')
+        sender.put(tenant, 'text', key)
+        sender.join()
+        assert delivered == [] and len(outbox.pending()) == 1
+
+        homework_module.redrive(outbox, sender, registry)
+        sender.close()
+        assert delivered == ['text'] and outbox.pending() == []
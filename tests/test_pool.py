@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import homework
+from lifecycle import Lifecycle
+from tenants import Tenant
+
+
+def payload(token):
+    return {
+        'homeworks': [{
+            'id': token, 'homework_name': token, 'status': 'approved'
+        }],
+        'current_date': 1000
+    }
+
+
+class TestPollPool:
+
+    def test_tenants_are_polled_in_parallel(
+        self, monkeypatch, api_response, bot, make_poller
+    ):
+        active, peak = [], []
+        lock = threading.Lock()
+
+        def slow_get(url, headers=None, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.1)
+            with lock:
+                active.pop()
+            return api_response(payload(headers['Authorization']))
+
+        monkeypatch.setattr(requests, 'get', slow_get)
+        poller = make_poller(bot, pool=ThreadPoolExecutor(8))
+        tenants = [Tenant(f'token-{number}', number) for number in range(8)]
+        started = time.monotonic()
+        results = list(poller.poll_all(tenants, Lifecycle()))
+        poller.close()
+        assert time.monotonic() - started < 0.5
+        assert max(peak) > 1
+        assert results == [(tenant, True) for tenant in tenants]
+        assert sorted(bot.chats) == list(range(8))
+
+    def test_stopping_skips_remaining_tenants(
+        self, monkeypatch, api_response, bot, make_poller
+    ):
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda url, headers=None, **kwargs: api_response(payload('token'))
+        )
+        lifecycle = Lifecycle()
+        lifecycle.stopping = True
+        poller = make_poller(bot, pool=ThreadPoolExecutor(2))
+        tenant = Tenant('token', 1)
+        assert list(poller.poll_all([tenant], lifecycle)) == [(tenant, None)]
+        poller.close()
+
+    def test_shared_session_is_used(
+        self, monkeypatch, api_response, bot, make_poller
+    ):
+        calls = []
+
+        class Session:
+            def get(self, url, headers=None, **kwargs):
+                calls.append(headers['Authorization'])
+                return api_response(payload('token'))
+
+        monkeypatch.setattr(homework, 'HTTP_SESSION', Session())
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: calls.append('requests.get')
+        )
+        poller = make_poller(bot, pool=ThreadPoolExecutor(2))
+        poller.poll_tenant(Tenant('token', 1))
+        poller.close()
+        assert calls == ['OAuth token']
+
+    def test_session_pool_matches_threads(self):
+        session = homework.create_session(16)
+        adapter = session.get_adapter('https://practicum.yandex.ru')
+        assert adapter._pool_maxsize == 16
+        assert adapter._pool_block
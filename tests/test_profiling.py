@@ -0,0 +1,46 @@
+import os
+import pstats
+import signal
+import tracemalloc
+
+from profiling import SignalProfiler
+
+
+def busy():
+    return sum(number * number for number in range(1000))
+
+
+class TestSignalProfiler:
+
+    def test_signals_toggle_profile_and_snapshot(self, tmp_path):
+        profiler = SignalProfiler(str(tmp_path))
+        previous = signal.getsignal(signal.SIGUSR1)
+        profiler.install()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            busy()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            os.kill(os.getpid(), signal.SIGUSR2)
+            leak = [object() for _ in range(100)]
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert len(leak) == 100
+        finally:
+            profiler.uninstall()
+        assert signal.getsignal(signal.SIGUSR1) is previous
+        assert not tracemalloc.is_tracing()
+        profile, = tmp_path.glob('profile-*.prof')
+        functions = {name for _, _, name in pstats.Stats(str(profile)).stats}
+        assert 'busy' in functions
+        snapshot, = tmp_path.glob('memory-*.tracemalloc')
+        stats = tracemalloc.Snapshot.load(str(snapshot)).statistics('lineno')
+        assert any(
+            stat.traceback[0].filename == __file__ for stat in stats
+        ), 'Снимок должен содержать выделения между сигналами'
+
+    def test_uninstall_saves_running_profile(self, tmp_path):
+        profiler = SignalProfiler(str(tmp_path))
+        profiler.toggle_profile()
+        profiler.toggle_tracemalloc()
+        profiler.uninstall()
+        assert profiler.profile is None and not profiler.tracing
+        assert len(list(tmp_path.iterdir())) == 2
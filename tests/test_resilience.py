@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+import resilience
+from exceptions import ApiCodeError, CircuitOpenError
+from resilience import (CircuitBreaker, ResilientCaller, RetryPolicy,
+                        parse_retry_after)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(resilience.time, 'sleep', slept.append)
+    return slept
+
+
+def failing(*errors):
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+    return call
+
+
+class TestResilience:
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('5') == 5
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('garbage') is None
+        assert parse_retry_after(
+            'Thu, 01 Jan 1970 00:01:40 GMT', now=40
+        ) == 60
+
+    def test_transient_errors_are_retried(self, sleeps):
+        caller = ResilientCaller(RetryPolicy(attempts=3, base_delay=1))
+        call = failing(ApiCodeError(), ApiCodeError('', 502))
+        assert caller.call(call) == 'ok'
+        assert len(sleeps) == 2
+        assert all(0 <= delay <= 2 for delay in sleeps)
+
+    def test_stop_interrupts_retry_pause(self):
+        stopping = threading.Event()
+        threading.Timer(0.05, stopping.set).start()
+        caller = ResilientCaller(stopping=stopping.is_set)
+        started = time.monotonic()
+        with pytest.raises(ApiCodeError):
+            caller.call(failing(ApiCodeError('', 429, 5)))
+        assert time.monotonic() - started < 0.5
+
+    def test_retry_after_is_honored(self, sleeps):
+        caller = ResilientCaller()
+        assert caller.call(failing(ApiCodeError('', 429, 7))) == 'ok'
+        assert sleeps == [7]
+
+    @pytest.mark.parametrize('error', [
+        ApiCodeError('', 401), ApiCodeError('', 404), ValueError(),
+        ApiCodeError('', 429, 3600),
+    ])
+    def test_permanent_errors_are_not_retried(self, sleeps, error):
+        with pytest.raises(type(error)):
+            ResilientCaller().call(failing(error))
+        assert sleeps == []
+
+    def test_breaker_opens_and_recovers(self, sleeps):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60,
+                                 clock=clock)
+        caller = ResilientCaller(RetryPolicy(attempts=0), breaker)
+        for _ in range(2):
+            with pytest.raises(ApiCodeError):
+                caller.call(failing(ApiCodeError('', 503)))
+        assert (breaker.state, breaker.failures) == ('open', 2)
+        with pytest.raises(CircuitOpenError):
+            caller.call(failing())
+
+        clock.now = 61
+        with pytest.raises(ApiCodeError):
+            caller.call(failing(ApiCodeError('', 503)))
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 122
+        assert caller.call(failing()) == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_auth_errors_do_not_open_breaker(self, sleeps):
+        breaker = CircuitBreaker(failure_threshold=1)
+        with pytest.raises(ApiCodeError):
+            ResilientCaller(breaker=breaker).call(
+                failing(ApiCodeError('', 401))
+            )
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_rate_limit_does_not_open_breaker(self, sleeps):
+        breaker = CircuitBreaker(failure_threshold=1)
+        caller = ResilientCaller(RetryPolicy(attempts=1), breaker)
+        for _ in range(3):
+            with pytest.raises(ApiCodeError):
+                caller.call(failing(
+                    ApiCodeError('', 429, 2), ApiCodeError('', 429, 2)
+                ))
+        assert sleeps == [2, 2, 2], 'Retry-After из ответа 429 соблюдается'
+        assert breaker.state == CircuitBreaker.CLOSED, (
+            'Ответы 429 одного токена не останавливают опрос остальных'
+        )
@@ -0,0 +1,138 @@
+import random
+
+from scheduler import AdaptiveScheduler
+from tenants import Tenant, TenantRegistry
+
+
+def reviewing(tenant):
+    tenant.index.update({'id': 1, 'status': 'reviewing'})
+
+
+class OnlyGet(TenantRegistry):
+    """Реестр, который нельзя обходить целиком."""
+
+    def __iter__(self):
+        raise AssertionError('Планировщик не должен обходить реестр')
+
+
+class TestAdaptiveScheduler:
+
+    def make_scheduler(self, **kwargs):
+        return AdaptiveScheduler(600, 120, 3600, idle_polls=2, **kwargs)
+
+    def test_first_cycle_uses_base_period(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        registry = TenantRegistry([tenant])
+        scheduler.add(registry)
+        assert scheduler.due(registry) == [tenant]
+        scheduler.schedule(tenant, changed=True)
+        assert scheduler.due(registry) == []
+        assert scheduler.advance() == 600
+        assert scheduler.due(registry) == [tenant]
+
+    def test_reviewing_shortens_interval(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        reviewing(tenant)
+        scheduler.schedule(tenant, changed=True)
+        assert scheduler.advance() == 120
+
+    def test_idle_stretches_interval_up_to_max(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        delays = []
+        for _ in range(7):
+            scheduler.schedule(tenant, changed=False)
+            delays.append(scheduler.advance())
+        assert delays == [600, 600, 1200, 2400, 3600, 3600, 3600]
+        scheduler.schedule(tenant, changed=True)
+        assert scheduler.advance() == 600
+
+    def test_budget_stretches_all_intervals(self):
+        scheduler = self.make_scheduler(hourly_budget=6)
+        tenants = TenantRegistry(
+            Tenant('token', chat_id) for chat_id in range(2)
+        )
+        scheduler.add(tenants)
+        polls = {tenant.tenant_id: [] for tenant in tenants}
+        for _ in range(6):
+            for tenant in scheduler.due(tenants):
+                polls[tenant.tenant_id].append(scheduler.now)
+                scheduler.schedule(tenant, changed=True)
+            scheduler.advance()
+        # Бюджет превышен только после планирования второго получателя,
+        # дальше оба опрашиваются раз в 1200 с.
+        assert polls == {'0': [0, 600, 1800, 3000], '1': [0, 1200, 2400]}
+
+    def test_next_due_tenant_defines_delay(self):
+        scheduler = self.make_scheduler()
+        active, idle = Tenant('token', 1), Tenant('token', 2)
+        reviewing(active)
+        scheduler.schedule(idle, changed=True)
+        scheduler.schedule(active, changed=True)
+        assert scheduler.advance() == 120
+        assert scheduler.due(TenantRegistry([active, idle])) == [active]
+
+    def test_rewind_after_early_wake(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        scheduler.schedule(tenant, changed=False)
+        delay = scheduler.advance()
+        scheduler.rewind(delay - 10)
+        assert scheduler.due(TenantRegistry([tenant])) == []
+        assert scheduler.advance() == delay - 10
+
+    def test_new_tenants_spread_over_start_rate(self):
+        scheduler = self.make_scheduler(start_rate=10, rng=random.Random(2))
+        tenants = TenantRegistry(
+            Tenant('token', chat_id) for chat_id in range(100)
+        )
+        scheduler.add(tenants)
+        first = {}
+        while len(first) < len(tenants):
+            for tenant in scheduler.due(tenants):
+                first.setdefault(tenant.tenant_id, scheduler.now)
+                scheduler.schedule(tenant, changed=True)
+            scheduler.advance()
+        assert max(first.values()) < 10
+        assert max(
+            list(first.values()).count(second) for second in range(10)
+        ) < 25, 'Первые опросы должны разойтись по секундам'
+
+    def test_forget_cancels_timer(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        scheduler.schedule(tenant, changed=True)
+        scheduler.forget(tenant)
+        assert len(scheduler.wheel) == 0
+        assert scheduler.advance() == 600
+
+    def test_due_does_not_walk_registry(self):
+        scheduler = self.make_scheduler()
+        tenants = [Tenant('token', chat_id) for chat_id in range(3)]
+        registry = OnlyGet(tenants)
+        scheduler.add(tenants)
+        assert scheduler.due(registry) == tenants
+        for tenant in tenants:
+            scheduler.schedule(tenant, changed=True)
+        assert scheduler.due(registry) == []
+
+    def test_add_keeps_existing_schedule(self):
+        scheduler = self.make_scheduler()
+        tenant = Tenant('token', 1)
+        scheduler.schedule(tenant, changed=True)
+        scheduler.add([tenant, Tenant('token', 2)])
+        assert [
+            due.tenant_id for due in scheduler.due(
+                TenantRegistry([tenant, Tenant('token', 2)])
+            )
+        ] == ['2']
+
+    def test_removed_tenant_is_dropped(self):
+        scheduler = self.make_scheduler(hourly_budget=6)
+        kept, removed = Tenant('token', 1), Tenant('token', 2)
+        scheduler.add([kept, removed])
+        assert scheduler.due(TenantRegistry([kept])) == [kept]
+        assert '2' not in scheduler._slots
+        assert scheduler.due(TenantRegistry([kept, removed])) == [kept]
@@ -0,0 +1,190 @@
+import sharding
+from scheduler import AdaptiveScheduler
+from sharding import HashRing, Shard
+from state import StateStore
+from supervisor import Supervisor
+from tenants import Tenant, TenantRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def make_registry(count=200):
+    return TenantRegistry(
+        Tenant(f'token-{chat_id}', chat_id) for chat_id in range(count)
+    )
+
+
+def make_scheduler():
+    return AdaptiveScheduler(600, 120, 3600)
+
+
+class TestHashRing:
+
+    def test_keys_are_spread_across_nodes(self):
+        ring = HashRing(['a', 'b', 'c'])
+        owners = [ring.owner(str(key)) for key in range(3000)]
+        for node in 'abc':
+            assert 700 < owners.count(node) < 1300
+
+    def test_only_removed_node_keys_move(self):
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b'])
+        for key in map(str, range(1000)):
+            if before.owner(key) != 'c':
+                assert after.owner(key) == before.owner(key)
+
+    def test_empty_ring(self):
+        assert HashRing([]).owner('key') is None
+
+
+class TestShard:
+
+    def make_shards(self, tmp_path, clock, names=('w0', 'w1')):
+        path = tmp_path / 'state.sqlite3'
+        shards = [Shard(path, name, ttl=30, clock=clock) for name in names]
+        for shard in shards:
+            shard.beat()
+        return shards, StateStore(path)
+
+    def test_each_tenant_has_one_owner(self, tmp_path):
+        clock = Clock()
+        shards, store = self.make_shards(tmp_path, clock)
+        registry = make_registry()
+        owned = [
+            {tenant.tenant_id for tenant in shard.claim(
+                registry, store, make_scheduler()
+            )}
+            for shard in shards
+        ]
+        assert not owned[0] & owned[1]
+        assert len(owned[0] | owned[1]) == len(registry)
+
+    def test_dead_worker_tenants_move(self, tmp_path):
+        clock = Clock()
+        (alive, dead), store = self.make_shards(tmp_path, clock)
+        registry = make_registry()
+        dead.claim(registry, store, make_scheduler())
+        assert len(alive.claim(registry, store, make_scheduler())) < 200
+        clock.now += 31
+        alive.beat()
+        assert len(alive.claim(registry, store, make_scheduler())) == 200
+
+    def test_live_lease_is_not_taken(self, tmp_path):
+        clock = Clock()
+        (first,), store = self.make_shards(tmp_path, clock, names=('w0',))
+        registry = make_registry()
+        scheduler = make_scheduler()
+        assert len(first.claim(registry, store, scheduler)) == 200
+        assert len(scheduler.due(registry)) + len(scheduler.wheel) == 200
+        second = Shard(tmp_path / 'state.sqlite3', 'w1', ttl=30, clock=clock)
+        second.beat()
+        assert len(second.claim(registry, store, make_scheduler())) == 0, (
+            'Аренды живого воркера нельзя забрать'
+        )
+        first.claim(registry, store, make_scheduler())
+        taken = second.claim(registry, store, make_scheduler())
+        assert 0 < len(taken) < 200
+        assert not {tenant.tenant_id for tenant in taken} & first.owned
+
+    def test_state_is_handed_over(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        registry = make_registry(20)
+        first = Shard(path, 'w0', ttl=30, clock=clock)
+        first.beat()
+        store = StateStore(path)
+        for tenant in first.claim(registry, store, make_scheduler()):
+            store.record_cursor(tenant, 500)
+        clock.now += 10
+        second = Shard(path, 'w1', ttl=30, clock=clock)
+        second.beat()
+        first.beat()
+        assert first.beat(), 'Новый воркер меняет состав кольца'
+        first.claim(registry, store, make_scheduler())
+        other = make_registry(20)
+        taken = second.claim(other, StateStore(path), make_scheduler())
+        assert len(taken)
+        assert all(tenant.timestamp == 500 for tenant in taken), (
+            'Отпуская получателей, воркер записывает их состояние'
+        )
+
+    def test_claim_is_cached_until_ring_or_registry_changes(
+        self, monkeypatch, tmp_path
+    ):
+        clock = Clock()
+        (first,), store = self.make_shards(tmp_path, clock, names=('w0',))
+        registry = make_registry()
+        scheduler = make_scheduler()
+        owned = first.claim(registry, store, scheduler)
+        hashed, ring_hash = [], sharding.ring_hash
+
+        def counting_hash(key):
+            hashed.append(key)
+            return ring_hash(key)
+
+        monkeypatch.setattr(sharding, 'ring_hash', counting_hash)
+        assert first.claim(registry, store, scheduler) is owned
+        assert hashed == [], 'Без изменений доля не пересчитывается'
+        registry.add(Tenant('token-new', 'new'))
+        assert len(first.claim(registry, store, scheduler)) == 201
+        assert hashed
+        hashed.clear()
+        clock.now += 5
+        second = Shard(tmp_path / 'state.sqlite3', 'w1', ttl=30, clock=clock)
+        second.beat()
+        assert len(first.claim(registry, store, scheduler)) < 201
+        assert hashed, 'Новый воркер в кольце требует пересчета'
+
+    def test_close_releases_leases(self, tmp_path):
+        clock = Clock()
+        (first, second), store = self.make_shards(tmp_path, clock)
+        registry = make_registry()
+        first.claim(registry, store, make_scheduler())
+        first.close()
+        assert len(second.claim(registry, store, make_scheduler())) == 200
+
+
+class Process:
+    def __init__(self, alive=True, exitcode=None):
+        self.alive = alive
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.alive
+
+
+class TestSupervisor:
+
+    def test_dead_worker_restarts_after_delay(self):
+        clock = Clock()
+        supervisor = Supervisor(2, restart_delay=60, clock=clock)
+        started = []
+        supervisor.start = started.append
+        supervisor.processes = {
+            'worker-0': Process(), 'worker-1': Process(False, 1)
+        }
+        supervisor.check()
+        assert started == []
+        clock.now += 59
+        supervisor.check()
+        assert started == []
+        clock.now += 1
+        supervisor.check()
+        assert started == ['worker-1']
+
+    def test_restart_delay_grows(self):
+        clock = Clock()
+        supervisor = Supervisor(1, restart_delay=60, clock=clock)
+        supervisor.start = lambda name: None
+        supervisor.processes = {'worker-0': Process(False, 1)}
+        supervisor.check()
+        clock.now += 60
+        supervisor.check()
+        supervisor.check()
+        assert supervisor._delays['worker-0'] == 120
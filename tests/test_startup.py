@@ -0,0 +1,61 @@
+import io
+import os
+import subprocess
+import sys
+
+from startup import StartupProfile
+
+
+class TestStartupProfile:
+
+    def test_report_lists_steps(self):
+        ticks = iter([0.0, 0.010, 0.025, 0.030])
+        profile = StartupProfile(clock=lambda: next(ticks))
+        profile.enabled = True
+        profile.mark('импорт')
+        profile.mark('состояние')
+        stream = io.StringIO()
+        profile.finish('первый цикл', stream)
+        lines = stream.getvalue().splitlines()
+        assert [line.split()[0] for line in lines] == [
+            'импорт', 'состояние', 'первый', 'итого'
+        ]
+        assert lines[-1].endswith('30.0 мс')
+
+    def test_finish_stops_recording(self):
+        profile = StartupProfile()
+        profile.finish('первый цикл')
+        profile.mark('следующий цикл')
+        assert len(profile.steps) == 1
+
+    def test_heavy_modules_are_imported_lazily(self):
+        code = (
+            'import sys, homework; '
+            'print(sorted(name for name in ("requests", "telebot", '
+            '"asyncio", "orjson", "http.server") if name in sys.modules))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True
+        )
+        assert result.stdout.strip() == '[]'
+
+    def test_profile_is_printed_when_startup_fails(self, tmp_path):
+        env = {
+            name: value for name, value in os.environ.items()
+            if name not in (
+                'TOKEN', 'CHAT_ID', 'PRACTICUM_TOKEN', 'TENANTS_FILE'
+            )
+        }
+        env['LOG_FILE'] = str(tmp_path / 'bot.log')
+        homework = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'homework.py'
+        )
+        result = subprocess.run(
+            [sys.executable, homework, '--startup-profile'], cwd=tmp_path,
+            env=env, capture_output=True, text=True
+        )
+        assert result.returncode != 0
+        assert 'Токены не прошли валидацию' in result.stderr
+        assert 'остановка до первого цикла' in result.stderr
+        assert 'итого' in result.stderr
@@ -0,0 +1,94 @@
+import requests
+
+from state import StateStore
+from tenants import Tenant
+
+HOMEWORK = {
+    'id': 7, 'homework_name': 'hw', 'status': 'approved',
+    'date_updated': '2021-04-11T10:31:09Z'
+}
+
+
+class TestStateStore:
+
+    def test_writes_are_batched(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = StateStore(path, batch_size=3, flush_interval=3600)
+        tenant = Tenant('token', 1)
+        store.record_status(tenant, HOMEWORK)
+        store.record_cursor(tenant, 100)
+        store.maybe_flush()
+        restored = Tenant('token', 1)
+        StateStore(path).load(restored)
+        assert restored.timestamp == 0, 'Запись должна быть отложенной'
+
+        store.record_cursor(Tenant('token', 2), 50)
+        store.maybe_flush()
+        assert store.pending == 0
+        StateStore(path).load(restored)
+        assert restored.timestamp == 100
+        assert restored.index.status('7') == 'approved'
+        assert restored.index.diff([HOMEWORK]) == []
+
+    def test_statuses_are_served_from_memory(self):
+        store = StateStore(':memory:')
+        tenant = Tenant('token', 1)
+        store.record_status(tenant, HOMEWORK)
+        store.flush()
+        assert store.statuses(tenant) == [
+            ('hw', 'approved', '2021-04-11T10:31:09Z')
+        ]
+        connection, store.connection = store.connection, None
+        store.record_status(tenant, dict(
+            HOMEWORK, status='rejected', date_updated='2021-04-12T10:00:00Z'
+        ))
+        assert store.statuses(tenant) == [
+            ('hw', 'rejected', '2021-04-12T10:00:00Z')
+        ], 'Повторная команда не читает базу'
+        store.connection = connection
+
+    def test_restart_does_not_resend(self, tmp_path, monkeypatch,
+                                     homework_module, api_response, bot,
+                                     make_poller):
+        path = tmp_path / 'state.sqlite3'
+        requested = []
+
+        def fake_get(url, params=None, **kwargs):
+            requested.append(params['from_date'])
+            return api_response(
+                {'homeworks': [HOMEWORK], 'current_date': 1000}
+            )
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        for _ in range(2):
+            store = StateStore(path)
+            tenant = Tenant('token', 1)
+            store.load(tenant)
+            poller = make_poller(bot, store=store)
+            poller.poll_tenant(tenant)
+            poller.sender.close()
+            store.close()
+        assert len(bot.messages) == 1
+        assert requested == [0, 1000 - homework_module.CURSOR_OVERLAP]
+
+    def test_cursor_follows_server_with_overlap(self, homework_module):
+        tenant = Tenant('token', 1)
+        tenant.timestamp = 500
+        overlap = homework_module.CURSOR_OVERLAP
+        assert homework_module.next_cursor(
+            tenant, {'homeworks': [], 'current_date': 1000}
+        ) == 1000 - overlap
+        assert homework_module.next_cursor(
+            tenant, {'homeworks': [], 'current_date': 10}
+        ) == 500
+        assert homework_module.next_cursor(tenant, {'homeworks': []}) == 500
+
+    def test_overlap_duplicates_are_skipped(self, homework_module):
+        tenant = Tenant('token', 1)
+        StateStore(':memory:').record_status(tenant, HOMEWORK)
+        response = {'homeworks': [HOMEWORK], 'current_date': 1000}
+        assert homework_module.status_changes(tenant, response) == []
+        updated = dict(HOMEWORK, date_updated='2021-04-12T10:00:00Z')
+        response['homeworks'] = [updated]
+        [(homework, _)] = homework_module.status_changes(tenant, response)
+        assert homework is updated
@@ -0,0 +1,89 @@
+import json
+import tracemalloc
+
+import pytest
+import requests
+
+from streaming import StreamedAnswer
+from tenants import Tenant
+
+PAYLOAD = {
+    'homeworks': [
+        {'id': number, 'homework_name': f'работа {number}',
+         'status': 'approved', 'date_updated': '2021-04-11T10:31:09Z'}
+        for number in range(50)
+    ],
+    'current_date': 1618000000
+}
+
+
+def split(body, size):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class TestStreamedAnswer:
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 10 ** 6])
+    def test_matches_full_parse(self, size):
+        body = json.dumps(PAYLOAD, ensure_ascii=False, indent=1).encode()
+        answer = StreamedAnswer(split(body, size))
+        assert list(answer.homeworks()) == PAYLOAD['homeworks']
+        assert answer.fields == {'current_date': 1618000000}
+
+    @pytest.mark.parametrize('body, error', [
+        (b'[]', TypeError),
+        (b'{"current_date": 1}', KeyError),
+        (b'{"homeworks": {}}', TypeError),
+        (b'{"homeworks": [{"id": 1}', json.JSONDecodeError),
+    ])
+    def test_invalid_structure(self, body, error):
+        with pytest.raises(error):
+            list(StreamedAnswer(split(body, 4)).homeworks())
+
+    def test_memory_does_not_grow_with_history(self):
+        item = json.dumps(PAYLOAD['homeworks'][0]).encode()
+
+        def chunks():
+            yield b'{"homeworks": ['
+            for number in range(10000):
+                yield (b',' if number else b'') + item
+            yield b'], "current_date": 1}'
+
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in StreamedAnswer(chunks()).homeworks())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert count == 10000
+        assert peak < 100 * 1024, 'Вся история не должна держаться в памяти'
+
+    def test_streaming_poll(
+        self, monkeypatch, homework_module, bot, make_poller
+    ):
+        closed = []
+
+        class Response:
+            status_code = 200
+
+            def iter_content(self, chunk_size):
+                assert chunk_size == homework_module.STREAM_CHUNK_SIZE
+                return iter(split(json.dumps(PAYLOAD).encode(), 100))
+
+            def close(self):
+                closed.append(True)
+
+        def fake_get(url, stream=False, **kwargs):
+            assert stream, 'История должна читаться потоком'
+            return Response()
+
+        monkeypatch.setattr(homework_module, 'STREAM_HISTORY', True)
+        monkeypatch.setattr(requests, 'get', fake_get)
+        tenant = Tenant('token', 1)
+        poller = make_poller(bot)
+        assert poller.poll_tenant(tenant)
+        poller.sender.close()
+        assert bot.texts == [homework_module.parse_status(PAYLOAD['homeworks'][0])]
+        assert len(tenant.index) == 50, 'История записывается без уведомлений'
+        assert closed == [True]
+        assert tenant.timestamp == 1618000000 - homework_module.CURSOR_OVERLAP
@@ -0,0 +1,205 @@
+import json
+import os
+
+import pytest
+import requests
+
+import tenants
+from exceptions import TenantConfigError
+from outbox import Outbox
+from state import StateStore
+from tenants import (
+    Tenant, TenantFile, TenantRegistry, activate, current_tenant
+)
+
+HOMEWORK = {
+    'id': 7, 'homework_name': 'hw', 'status': 'approved',
+    'date_updated': '2021-04-11T10:31:09Z'
+}
+
+
+class TestTenants:
+
+    def test_registry_from_file(self, tmp_path):
+        config = tmp_path / 'tenants.json'
+        config.write_text(json.dumps([
+            {'practicum_token': 'token-a', 'chat_id': 1},
+            {'practicum_token': 'token-b', 'chat_id': 2, 'id': 'bob'},
+        ]))
+        registry = TenantRegistry.from_file(config)
+        assert len(registry) == 2
+        assert registry.get('1').headers == {'Authorization': 'OAuth token-a'}
+        assert registry.get('bob').chat_id == 2
+
+    @pytest.mark.parametrize('entries', [
+        {'practicum_token': 'token'},
+        [{'practicum_token': 'token'}],
+        [{'practicum_token': 'a', 'chat_id': 1},
+         {'practicum_token': 'b', 'chat_id': 1}],
+    ])
+    def test_invalid_config(self, tmp_path, entries):
+        config = tmp_path / 'tenants.json'
+        config.write_text(json.dumps(entries))
+        with pytest.raises(TenantConfigError):
+            TenantRegistry.from_file(config)
+
+    def test_registry_indexes_tokens(self):
+        registry = TenantRegistry([
+            Tenant('shared', 1), Tenant('own', 2), Tenant('shared', 3)
+        ])
+        version = registry.version
+        assert registry.with_token('shared') == [
+            registry.get(1), registry.get(3)
+        ]
+        registry.remove(1)
+        registry.update(Tenant('shared', 2))
+        assert registry.with_token('shared') == [
+            registry.get(3), registry.get(2)
+        ]
+        assert registry.with_token('own') == []
+        assert registry.version == version + 2
+
+    def test_activate_sets_current_tenant(self):
+        first, second = Tenant('token-a', 1), Tenant('token-b', 2)
+        first.timestamp = 100
+        assert second.timestamp == 0
+        with activate(second):
+            assert current_tenant.get() is second
+        assert current_tenant.get() is None
+
+    def test_poll_uses_tenant_credentials(
+            self, monkeypatch, api_response, bot, make_poller
+    ):
+        requested = []
+
+        def fake_get(url, headers=None, **kwargs):
+            requested.append(headers['Authorization'])
+            return api_response({
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1
+            })
+
+        monkeypatch.setattr(requests, 'get', fake_get)
+        for tenant in (Tenant('token-a', 1), Tenant('token-b', 2)):
+            poller = make_poller(bot)
+            poller.poll_tenant(tenant)
+            poller.sender.close()
+        assert requested == ['OAuth token-a', 'OAuth token-b']
+        assert bot.chats == [1, 2]
+
+
+def write_tenants(path, entries):
+    path.write_text(json.dumps(entries))
+    stamp = path.stat().st_mtime_ns + 1
+    os.utime(path, ns=(stamp, stamp))
+
+
+class TestTenantFile:
+
+    def make_source(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [
+            {'practicum_token': 'token-a', 'chat_id': 1},
+            {'practicum_token': 'token-b', 'chat_id': 2},
+        ])
+        return path, TenantFile(path), TenantRegistry.from_file(path)
+
+    def test_unchanged_file_is_not_reloaded(self, tmp_path):
+        _, source, _ = self.make_source(tmp_path)
+        assert not source.changed()
+
+    def test_tenants_are_added_removed_and_rotated(self, tmp_path):
+        path, source, registry = self.make_source(tmp_path)
+        kept = registry.get('1')
+        kept.timestamp = 500
+        write_tenants(path, [
+            {'practicum_token': 'token-new', 'chat_id': 1},
+            {'practicum_token': 'token-c', 'chat_id': 3},
+        ])
+        assert source.changed()
+        added, removed, updated = source.reload(registry)
+        assert [tenant.tenant_id for tenant in added] == ['3']
+        assert [tenant.tenant_id for tenant in removed] == ['2']
+        assert updated == [kept]
+        assert kept.headers == {'Authorization': 'OAuth token-new'}
+        assert kept.timestamp == 500, 'Смена токена не сбрасывает курсор'
+        assert registry.get('2') is None and registry.by_chat(2) is None
+        assert registry.with_token('token-new') == [kept]
+        assert registry.with_token('token-c') == [registry.get('3')]
+        assert registry.with_token('token-b') == []
+        assert not source.changed()
+
+    def test_only_changed_entries_are_validated(
+            self, tmp_path, monkeypatch
+    ):
+        path, source, registry = self.make_source(tmp_path)
+        parsed = []
+        original = tenants.parse_tenant
+
+        def parse(entry):
+            parsed.append(entry['chat_id'])
+            return original(entry)
+
+        monkeypatch.setattr(tenants, 'parse_tenant', parse)
+        write_tenants(path, [
+            {'practicum_token': 'token-a', 'chat_id': 1},
+            {'practicum_token': 'token-b2', 'chat_id': 2},
+        ])
+        source.reload(registry)
+        assert parsed == [2]
+
+    def test_invalid_entry_keeps_previous_tenant(self, tmp_path):
+        path, source, registry = self.make_source(tmp_path)
+        write_tenants(path, [
+            {'practicum_token': '', 'chat_id': 1},
+            {'practicum_token': 'token-b', 'chat_id': 2},
+            {'chat_id': 3},
+        ])
+        assert source.reload(registry) == ([], [], [])
+        assert registry.get('1').headers == {
+            'Authorization': 'OAuth token-a'
+        }
+        assert len(registry) == 2
+
+    def test_broken_file_changes_nothing(self, tmp_path):
+        path, source, registry = self.make_source(tmp_path)
+        path.write_text('[{"practicum_token": ')
+        assert source.reload(registry) == ([], [], [])
+        assert len(registry) == 2
+
+    def test_reload_restores_state_and_drops_cache(
+            self, tmp_path, homework_module
+    ):
+        path, source, registry = self.make_source(tmp_path)
+        store = StateStore(':memory:')
+        store.record_cursor(Tenant('token-c', 3), 700)
+        store.flush()
+        rotated = registry.get('1')
+        homework_module.RESPONSE_CACHE.store(
+            rotated, 0, {}, b'{"homeworks": []}', json.loads
+        )
+        scheduler = homework_module.create_scheduler()
+        outbox = Outbox(':memory:', lease=0)
+        removed = registry.get('2')
+        store.record_cursor(removed, 500)
+        store.record_status(removed, HOMEWORK)
+        store.flush()
+        outbox.add(removed, HOMEWORK, 'text')
+        outbox.add(rotated, HOMEWORK, 'text')
+        write_tenants(path, [
+            {'practicum_token': 'token-new', 'chat_id': 1},
+            {'practicum_token': 'token-c', 'chat_id': 3},
+        ])
+        homework_module.reload_tenants(
+            source, registry, store, outbox, scheduler
+        )
+        assert registry.get('3').timestamp == 700
+        assert registry.get('3') in scheduler.due(registry)
+        assert homework_module.RESPONSE_CACHE.replay(rotated, 0) is None
+        assert [row[1] for row in outbox.pending()] == ['1'], (
+            'Уведомления удаленного получателя не остаются в outbox'
+        )
+        returned = Tenant('token-b', 2)
+        store.load(returned)
+        assert returned.timestamp == 0 and not len(returned.index)
+        assert store.statuses(returned) == []
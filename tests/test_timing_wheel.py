@@ -0,0 +1,78 @@
+import random
+import time
+
+from timing_wheel import TimingWheel
+
+
+class TestTimingWheel:
+
+    def test_timers_expire_on_time_across_levels(self):
+        wheel = TimingWheel(now=5, bits=2, levels=3)
+        rng = random.Random(1)
+        deadlines = {key: 5 + rng.randrange(200) for key in range(300)}
+        for key, when in deadlines.items():
+            wheel.add(key, when)
+        expired = {}
+        while len(wheel):
+            assert wheel.next_time() == min(
+                deadlines[key] for key in deadlines if key not in expired
+            )
+            for key in wheel.advance(wheel.now + rng.randrange(1, 9)):
+                expired[key] = wheel.now
+        for key, when in deadlines.items():
+            assert when <= expired[key] < when + 9, (
+                'Таймер не должен срабатывать ни раньше срока, ни позже шага'
+            )
+
+    def test_exact_expiry_and_overflow(self):
+        wheel = TimingWheel(bits=2, levels=2)
+        wheel.add('near', 3)
+        wheel.add('far', 100)
+        assert wheel.overflow == {'far': 100}
+        fired = {}
+        for second in range(1, 101):
+            for key in wheel.advance(second):
+                fired[key] = second
+        assert fired == {'near': 3, 'far': 100}
+
+    def test_cancel_and_replace(self):
+        wheel = TimingWheel()
+        wheel.add('a', 10)
+        wheel.add('b', 5000)
+        wheel.add('a', 20)
+        wheel.cancel('b')
+        wheel.cancel('missing')
+        assert len(wheel) == 1 and 'b' not in wheel
+        assert wheel.next_time() == 20
+        assert wheel.advance(19) == []
+        assert wheel.advance(20) == ['a']
+        assert wheel.next_time() is None
+
+    def test_past_deadline_fires_now(self):
+        wheel = TimingWheel(now=50)
+        wheel.add('late', 10)
+        assert wheel.next_time() == 50
+        assert wheel.advance(50) == ['late']
+
+    def test_long_jumps_match_deadlines(self):
+        wheel = TimingWheel(now=3, bits=2, levels=3)
+        rng = random.Random(2)
+        deadlines = {key: 3 + rng.randrange(5000) for key in range(500)}
+        for key, when in deadlines.items():
+            wheel.add(key, when)
+        until = 3
+        while len(wheel):
+            until += rng.randrange(1, 400)
+            fired = wheel.advance(until)
+            assert sorted(fired) == sorted(
+                key for key in fired if deadlines.pop(key) <= until
+            )
+            assert all(when > until for when in deadlines.values())
+
+    def test_long_sleep_does_not_step_each_second(self):
+        wheel = TimingWheel()
+        wheel.add('far', 10 ** 7)
+        started = time.perf_counter()
+        assert wheel.advance(10 ** 7 - 1) == []
+        assert wheel.advance(10 ** 7) == ['far']
+        assert time.perf_counter() - started < 0.1
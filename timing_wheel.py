@@ -0,0 +1,113 @@
+"""Иерархическое колесо таймеров для расписания опроса."""
+
+
+class TimingWheel:
+    """Таймеры с целочисленными сроками в секундах.
+
+    Уровень `k` состоит из `2 ** bits` ячеек по `2 ** (bits * k)` секунд.
+    Таймер кладется на нижний уровень, который покрывает его срок, поэтому
+    вставка и отмена стоят O(1). Когда время входит в новую ячейку уровня,
+    ее таймеры раскладываются по нижним уровням, а ячейка нулевого уровня
+    хранит таймеры одной секунды. Сроки дальше верхнего уровня ждут в
+    `overflow` и раскладываются при каждом обороте его ячейки.
+    """
+
+    def __init__(self, now=0, bits=6, levels=4):
+        self.now = now
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = [[{} for _ in range(1 << bits)] for _ in range(levels)]
+        self.overflow = {}
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def __contains__(self, key):
+        return key in self._buckets
+
+    def add(self, key, when):
+        """Ставит таймер `key` на момент `when` вместо прежнего."""
+        self.cancel(key)
+        self._place(key, max(int(when), self.now))
+
+    def cancel(self, key):
+        """Снимает таймер `key`, если он есть."""
+        bucket = self._buckets.pop(key, None)
+        if bucket is not None:
+            del bucket[key]
+
+    def advance(self, until):
+        """Сдвигает время до `until` и возвращает ключи истекших таймеров.
+
+        Время переходит сразу к ближайшему сроку, а не посекундно, поэтому
+        долгая пауза без срабатываний стоит столько же, сколько короткая.
+        """
+        expired = self._expire()
+        while self.now < until:
+            target = self.next_time()
+            if target is None or target > until:
+                target = until
+            self._jump(max(target, self.now + 1))
+            expired.extend(self._expire())
+        return expired
+
+    def next_time(self):
+        """Ближайший срок среди таймеров; None, если таймеров нет."""
+        best = None
+        for level, slots in enumerate(self.levels):
+            shift = self.bits * level
+            block = self.now >> shift
+            # Таймеры уровня выше нулевого лежат не раньше следующего блока.
+            first = 1 if level else 0
+            if best is not None and best < (block + first) << shift:
+                return best
+            for offset in range(first, first + len(slots)):
+                bucket = slots[(block + offset) & self.mask]
+                if bucket:
+                    low = min(bucket.values())
+                    best = low if best is None else min(best, low)
+                    break
+        if self.overflow:
+            low = min(self.overflow.values())
+            best = low if best is None else min(best, low)
+        return best
+
+    def _place(self, key, when):
+        delta = when - self.now
+        bucket = self.overflow
+        for level, slots in enumerate(self.levels):
+            shift = self.bits * level
+            if delta < 1 << (shift + self.bits):
+                bucket = slots[(when >> shift) & self.mask]
+                break
+        bucket[key] = when
+        self._buckets[key] = bucket
+
+    def _jump(self, until):
+        # Ячейки, которые раскладывались бы на пройденных границах уровней,
+        # раскладываются один раз уже относительно нового времени.
+        moved = {}
+        for level, slots in enumerate(self.levels[1:], 1):
+            shift = self.bits * level
+            first = (self.now >> shift) + 1
+            crossed = (until >> shift) - first + 1
+            if crossed <= 0:
+                break
+            for block in range(first, first + min(crossed, len(slots))):
+                moved.update(slots[block & self.mask])
+                slots[block & self.mask] = {}
+        else:
+            moved.update(self.overflow)
+            self.overflow = {}
+        self.now = until
+        for key, when in moved.items():
+            self._place(key, when)
+
+    def _expire(self):
+        slots = self.levels[0]
+        index = self.now & self.mask
+        bucket, slots[index] = slots[index], {}
+        for key in bucket:
+            del self._buckets[key]
+        return list(bucket)